@@ -0,0 +1,99 @@
+"""
+多账号端到端基准：在本地回放服务器上以 1 / 10 / 50 个模拟账号运行完整任务流程，
+报告总耗时，以及每个任务平均每账号的请求数与字节数。
+
+用法:
+    python bench/bench_accounts.py [--fixtures fixtures/fixtures.jsonl] [--accounts 1,10,50]
+                                   [--latency 30] [--workers 10]
+
+未提供 --fixtures 时使用 synthetic_fixtures.py 生成的合成数据。基准只衡量网络与解析开销：
+会关闭 rate_limits 中的按动作限速，其余 performance 设置可通过 --config 传入的配置文件调整。
+每轮使用独立的临时状态目录，账号间不共享已表态记录与会话缓存。
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import gamemale_daily as gm  # noqa: E402
+from replay_server import FixtureStore, serve  # noqa: E402
+from synthetic_fixtures import write_fixtures  # noqa: E402
+
+
+def bench_config(config_path, workers):
+    base_config = {}
+    if config_path:
+        with open(config_path, encoding="utf-8") as f:
+            base_config = json.load(f)
+    base_config["notification"] = {"enabled": False}
+    performance = base_config.setdefault("performance", {})
+    performance["max_workers"] = workers
+    performance["rate_limits"] = {name: {"rate": 0} for name in gm.RATE_LIMIT_DEFAULTS if name != "jitter"}
+    return base_config
+
+
+def run_round(base_config, account_count, workers):
+    """运行一轮，返回 (耗时秒数, 按任务汇总的请求统计, 成功生成报告的账号数)"""
+    state_dir = tempfile.mkdtemp(prefix="gm-bench-")
+    os.environ["GM_STATE_DIR"] = state_dir
+    gm.configure_global_politeness(base_config)
+    gm.configure_shared_transport(base_config)
+    gm.configure_rate_limits(base_config)
+    gm.configure_html_extractor(base_config)
+    accounts = [{"cookie": f"bench_auth=account{i}", "username": f"bench{i}"} for i in range(account_count)]
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if workers > 1:
+            reports = gm.run_accounts_concurrently(base_config, accounts, workers)
+        else:
+            reports = gm.run_accounts_serially(base_config, accounts)
+    elapsed = time.perf_counter() - start
+
+    by_task = {}
+    for path in glob.glob(os.path.join(state_dir, "metrics", "requests_*.json")):
+        with open(path, encoding="utf-8") as f:
+            for task, totals in json.load(f)["by_task"].items():
+                entry = by_task.setdefault(task, {"count": 0, "bytes": 0})
+                entry["count"] += totals["count"]
+                entry["bytes"] += totals["bytes"]
+    completed = sum(1 for report in reports if "任务报告" in report)
+    return elapsed, by_task, completed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fixtures", help="录制或生成的 fixtures.jsonl，缺省时生成合成数据")
+    parser.add_argument("--accounts", default="1,10,50", help="逗号分隔的模拟账号数")
+    parser.add_argument("--latency", type=float, default=30.0, help="回放服务器每个请求的延迟（毫秒）")
+    parser.add_argument("--workers", type=int, default=10, help="同时处理的账号数上限")
+    parser.add_argument("--config", help="提供 performance 等设置的配置文件")
+    args = parser.parse_args()
+
+    fixtures = args.fixtures or write_fixtures(os.path.join(tempfile.mkdtemp(prefix="gm-fixtures-"), "fixtures.jsonl"))
+    server = serve(FixtureStore.load(fixtures), latency_ms=args.latency)
+    os.environ["GM_REPLAY_URL"] = "http://%s:%d" % server.server_address
+    print(f"回放数据: {fixtures}，延迟 {args.latency:g} ms")
+
+    for account_count in (int(n) for n in args.accounts.split(",") if n.strip()):
+        workers = min(args.workers, account_count)
+        elapsed, by_task, completed = run_round(bench_config(args.config, workers), account_count, workers)
+        total_requests = sum(entry["count"] for entry in by_task.values())
+        total_bytes = sum(entry["bytes"] for entry in by_task.values())
+        print(f"\n{account_count} 个账号 ({workers} 个并发, 完成 {completed}): 总耗时 {elapsed:.2f}s, "
+              f"共 {total_requests} 个请求 / {total_bytes / 1024:.0f} KiB")
+        print(f"  {'任务':<12}{'请求/账号':>10}{'KiB/账号':>12}")
+        for task, entry in sorted(by_task.items(), key=lambda item: -item[1]["count"]):
+            print(f"  {task:<12}{entry['count'] / account_count:>10.1f}{entry['bytes'] / 1024 / account_count:>12.1f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+响应分类微基准：对比原先内联的字符串正则与 in 判断、RESPONSE_RULES 分类器，以及把全部标记编译成
+一个正则的单遍扫描，报告每次调用的耗时，并校验三者结果一致。
+
+用法:
+    python bench/bench_classifier.py [--repeat 20000]
+
+单遍扫描一次找出所有类别的标记再按规则判定，用于确认它在这些响应上是否值得采用。
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import gamemale_daily as gm  # noqa: E402
+from bench_parsers import synthetic_blog_page, synthetic_poke_popup  # noqa: E402
+
+
+def _ajax(content):
+    return f'<?xml version="1.0" encoding="utf-8"?><root><![CDATA[{content}]]></root>'
+
+
+# --- 原先内联在各任务中的判断 ---
+
+def legacy_sign(text):
+    if 'succeed' in text or '签到成功' in text:
+        return "success"
+    if '已签' in text:
+        return "already"
+    return "unknown"
+
+
+def legacy_click(text):
+    if 'succeed' in text or '表态成功' in text:
+        return "success"
+    if '您已表过态' in text:
+        return "already"
+    return "unknown"
+
+
+def legacy_poke_popup(text):
+    return "already" if '今天您已经打过招呼了' in text else "unknown"
+
+
+def legacy_poke(text):
+    return "success" if '已发送' in text and '下次访问时会收到通知' in text else "unknown"
+
+
+def legacy_exchange(text):
+    return "success" if '积分操作成功' in text else "unknown"
+
+
+def legacy_session(text):
+    return "expired" if any(marker in text for marker in gm.SESSION_EXPIRED_MARKERS) else "unknown"
+
+
+def legacy_blog_page(text):
+    return "inaccessible" if any(marker in text for marker in gm.BLOG_INACCESSIBLE_MARKERS) else "unknown"
+
+
+def legacy_formhash(text):
+    match = re.search(r'formhash" value="([a-f0-9]+)"', text) or \
+        re.search(r'formhash=([a-f0-9]+)', text) or \
+        re.search(r'"formhash":"([a-f0-9]+)"', text)
+    return match.group(1) if match else None
+
+
+def legacy_blog_links(text):
+    # 原先按完整URL去重，同一日志带不同查询参数的链接会各处理一次
+    links, seen_urls = [], set()
+    for href in re.findall(r'href="([^"]*blog-\d+-\d+\.html[^"]*)"', text):
+        full_url = href if href.startswith('http') else "https://www.gamemale.com/" + href
+        if full_url in seen_urls:
+            continue
+        seen_urls.add(full_url)
+        id_match = re.search(r'blog-(\d+)-(\d+)', full_url)
+        links.append((id_match.group(1), int(id_match.group(2))))
+    return links
+
+
+LEGACY = {
+    "sign": legacy_sign, "click": legacy_click, "poke_popup": legacy_poke_popup, "poke": legacy_poke,
+    "exchange": legacy_exchange, "session": legacy_session, "blog_page": legacy_blog_page,
+}
+
+
+class SinglePassScanner:
+    """把所有类别的标记编译成一个正则，一次扫描得到出现的标记集合，再按 RESPONSE_RULES 判定"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        markers = sorted({m for kind_rules in rules.values() for _, ms in kind_rules for m in ms}, key=len, reverse=True)
+        # 前瞻匹配可以在同一位置之外找到重叠的标记；同一位置的较短标记由包含关系补齐
+        self._pattern = re.compile("(?=(%s))" % "|".join(map(re.escape, markers)))
+        self._implied = {m: {other for other in markers if other in m} for m in markers}
+
+    def classify(self, kind, text):
+        found = set()
+        for match in self._pattern.finditer(text):
+            found |= self._implied[match.group(1)]
+        for outcome, markers in self.rules[kind]:
+            if all(marker in found for marker in markers):
+                return outcome
+        return "unknown"
+
+
+def cases():
+    blog_page = synthetic_blog_page(filler_blocks=120)
+    list_page = "".join(f'<dt><a href="blog-{2000 + i % 97}-{100000 + i}.html">日志</a></dt>' for i in range(20))
+    return [
+        ("sign", _ajax("签到成功，获得金币")),
+        ("click", _ajax('表态成功<script>succeedhandle_click()</script>')),
+        ("click", _ajax("您已表过态")),
+        ("poke_popup", _ajax(synthetic_poke_popup())),
+        ("poke", _ajax("已发送，对方下次访问时会收到通知")),
+        ("exchange", _ajax("积分操作成功")),
+        ("session", blog_page),
+        ("blog_page", blog_page),
+        ("formhash", '<input type="hidden" name="formhash" value="abcdef12" />' * 3),
+        ("blog_links", list_page),
+    ]
+
+
+def timed(func, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(text)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20000, help="每个用例重复调用的次数")
+    args = parser.parse_args()
+
+    scanner = SinglePassScanner(gm.RESPONSE_RULES)
+    # 表头含中文（每字占两列），按数据列宽手工对齐
+    print("用例            字节    原内联µs    分类器µs  单遍扫描µs  结果")
+    for kind, text in cases():
+        if kind == "formhash":
+            variants = [legacy_formhash, gm.find_formhash]
+        elif kind == "blog_links":
+            variants = [legacy_blog_links, lambda t: list(gm.iter_blog_links(t, set()))]
+        else:
+            variants = [LEGACY[kind], lambda t, k=kind: gm.classify_response(k, t),
+                        lambda t, k=kind: scanner.classify(k, t)]
+        results = [variant(text) for variant in variants]
+        status = "一致" if all(result == results[0] for result in results) else f"不一致: {results!r}"
+        repeat = max(1, args.repeat // 50) if len(text) > 10000 else args.repeat
+        timings = "".join(f"{timed(variant, text, repeat):>12.2f}" for variant in variants)
+        print(f"{kind:<12}{len(text):>8}{timings:<38}  {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+HTML 提取后端微基准：对比各后端与当前 bs4(html.parser) 路径处理每个页面的 CPU 时间。
+
+用法:
+    python bench/bench_parsers.py [--pages 200] [--page-file blog.html]
+
+未提供 --page-file 时使用按论坛结构生成的合成页面；未安装的后端会被跳过。
+每个后端的结果都会先与 bs4 的结果比对，不一致时报告差异。
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import gamemale_daily as gm  # noqa: E402
+
+
+def synthetic_blog_page(blog_id=123456, filler_blocks=300):
+    filler = "".join(
+        f'<div class="pbm"><p class="xg1">评论 {i}: <a href="space-uid-{i}.html">用户{i}</a> '
+        f'<span>{"这是一段日志正文 " * 8}</span></p></div>\n'
+        for i in range(filler_blocks)
+    )
+    button = (
+        f'<a href="home.php?mod=spacecp&amp;ac=click&amp;op=add&amp;clickid=1&amp;idtype=blogid'
+        f'&amp;id={blog_id}&amp;hash=abcdef12" id="click_blogid_{blog_id}_1" onclick="ajaxmenu(this)">震惊</a>'
+    )
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>日志</title></head><body>'
+        f'<div id="ct">{filler[: len(filler) // 3]}<div id="click_div">{button}</div>{filler}</div>'
+        '</body></html>'
+    )
+
+
+def synthetic_credit_page():
+    items = "".join(f'<li><em> 积分{i}: </em>{i * 10} 点 &nbsp; </li>' for i in range(8))
+    return f'<html><body>{"<div>填充</div>" * 200}<ul class="creditl mtm bbda cl">{items}</ul></body></html>'
+
+
+def synthetic_rule_log_page(rows=40):
+    body = "".join(
+        f'<tr><td><a href="#">任务{i}</a></td><td>{i}</td><td>1</td><td>2</td><td>2026-10-{i % 28 + 1:02d} 00:00</td></tr>'
+        for i in range(rows)
+    )
+    return f'<html><body>{"<div>填充</div>" * 200}<table class="dt"><tr><th>名称</th></tr>{body}</table></body></html>'
+
+
+def synthetic_poke_popup(uid=42):
+    return (
+        f'<form method="post" id="pokeform_{uid}" action="home.php?mod=spacecp&amp;ac=poke&amp;op=send&amp;uid={uid}">'
+        '<input type="hidden" name="referer" value="x" /><input type="hidden" name="formhash" value="abcdef12" />'
+        + '<li><input type="radio" name="iconid" value="1" /></li>' * 20 + '</form>'
+    )
+
+
+def cases(page_file=None):
+    blog_page = open(page_file, encoding="utf-8").read() if page_file else synthetic_blog_page()
+    return [
+        ("日志页 震惊按钮", lambda e: e.shock_button_href(blog_page), len(blog_page)),
+        ("打招呼弹窗 表单", lambda e: e.form_action_and_formhash(synthetic_poke_popup(), "pokeform_42"), 0),
+        ("积分页 creditl", lambda e: e.credit_items(synthetic_credit_page()), 0),
+        ("任务统计 table.dt", lambda e: e.table_rows(synthetic_rule_log_page(), "dt"), 0),
+    ]
+
+
+def available_extractors():
+    extractors = []
+    for name, extractor_class in gm.HTML_EXTRACTOR_BACKENDS.items():
+        try:
+            extractors.append(extractor_class())
+        except ImportError as e:
+            if not extractor_class.is_missing_dependency(e):
+                raise
+            print(f"(跳过 {name}: 未安装)")
+    return extractors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=200, help="每个用例重复解析的页面数")
+    parser.add_argument("--page-file", help="使用真实保存的日志页面代替合成页面")
+    args = parser.parse_args()
+
+    extractors = available_extractors()
+    reference = gm.HtmlExtractor()
+    for case_name, run, size in cases(args.page_file):
+        expected = run(reference)
+        size_text = f" ({size / 1024:.0f} KiB)" if size else ""
+        print(f"\n{case_name}{size_text}")
+        timings = {}
+        for extractor in extractors:
+            result = run(extractor)
+            start = time.process_time()
+            for _ in range(args.pages):
+                run(extractor)
+            timings[extractor.name] = (time.process_time() - start) / args.pages * 1000
+            status = "一致" if result == expected else f"不一致: {result!r}"
+            print(f"  {extractor.name:<11} {timings[extractor.name]:8.3f} ms/页  {status}")
+        if timings.get("bs4"):
+            speedups = ", ".join(f"{name} {timings['bs4'] / cost:.1f}x"
+                                 for name, cost in timings.items() if name != "bs4" and cost)
+            print(f"  相对当前 bs4 路径: {speedups}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+本地回放服务器：按录制的 fixtures.jsonl 响应论坛请求，可模拟网络延迟。
+
+录制（访问真实论坛，响应写入 <目录>/fixtures.jsonl，其中包含账号数据，请勿提交或公开）:
+    GM_RECORD_DIR=fixtures python gamemale_daily.py
+
+回放:
+    python bench/replay_server.py fixtures/fixtures.jsonl --port 8765 --latency 50
+    GM_REPLAY_URL=http://127.0.0.1:8765 python gamemale_daily.py
+
+请求先按 fixture_key（方法 + 路径 + 稳定查询参数）精确匹配，找不到时退回同方法、同端点类别的录制响应
+（例如访问录制时没有出现过的用户空间）；同一键有多条录制时依次轮换。HEAD 请求可使用 GET 的录制。
+"""
+import argparse
+import base64
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import gamemale_daily as gm  # noqa: E402
+
+
+class FixtureStore:
+    """按匹配键与 (方法, 端点类别) 索引录制的响应"""
+
+    def __init__(self, entries):
+        self._lock = threading.Lock()
+        self._by_key = {}
+        self._by_endpoint = {}
+        self._cursors = {}
+        for entry in entries:
+            self._by_key.setdefault(entry["key"], []).append(entry)
+            method = entry["key"].split(" ", 1)[0]
+            self._by_endpoint.setdefault((method, entry["endpoint"]), []).append(entry)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.loads(line) for line in f if line.strip())
+
+    def _next(self, bucket_key, candidates):
+        with self._lock:
+            cursor = self._cursors.setdefault(bucket_key, itertools.count())
+            return candidates[next(cursor) % len(candidates)]
+
+    def lookup(self, method, path):
+        url = f"https://{gm.FORUM_HOST}{path}"
+        methods = [method, "GET"] if method == "HEAD" else [method]
+        for candidate_method in methods:
+            key = gm.fixture_key(candidate_method, url)
+            if key in self._by_key:
+                return self._next(key, self._by_key[key])
+        endpoint = gm.classify_endpoint(url)
+        for candidate_method in methods:
+            bucket = (candidate_method, endpoint)
+            if bucket in self._by_endpoint:
+                return self._next(bucket, self._by_endpoint[bucket])
+        return None
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    store = None
+    latency = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def _replay(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if self.latency:
+            time.sleep(self.latency)
+        entry = self.store.lookup(self.command, self.path)
+        if entry is None:
+            status, headers, body = 404, {"Content-Type": "text/plain"}, b"no fixture"
+        else:
+            status, headers, body = entry["status"], entry["headers"], base64.b64decode(entry["body"])
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_GET = do_POST = do_HEAD = _replay
+
+
+def serve(store, host="127.0.0.1", port=0, latency_ms=0.0):
+    """在后台线程启动回放服务器，返回 server（server.server_address 为实际地址）"""
+    handler = type("BoundReplayHandler", (ReplayHandler,), {"store": store, "latency": latency_ms / 1000.0})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("fixtures", help="录制得到的 fixtures.jsonl")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求附加的延迟（毫秒）")
+    args = parser.parse_args()
+
+    server = serve(FixtureStore.load(args.fixtures), args.host, args.port, args.latency)
+    host, port = server.server_address
+    print(f"回放服务器已启动: http://{host}:{port} (延迟 {args.latency:g} ms)，按 Ctrl+C 退出")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+生成合成的回放数据：按论坛页面结构构造登录检查、formhash、签到、抽奖、日志列表与日志页、表态、
+空间访问、打招呼、积分页与任务统计表的响应，格式与 GM_RECORD_DIR 录制的 fixtures.jsonl 相同。
+
+用法:
+    python bench/synthetic_fixtures.py fixtures.jsonl [--list-pages 5] [--blogs-per-page 20]
+
+没有可用的录制数据时，bench/bench_accounts.py 会使用这里生成的数据。
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import gamemale_daily as gm  # noqa: E402
+from bench_parsers import (  # noqa: E402
+    synthetic_blog_page, synthetic_credit_page, synthetic_poke_popup, synthetic_rule_log_page,
+)
+
+FORUM = f"https://{gm.FORUM_HOST}/"
+
+
+def _entry(method, url, body, content_type="text/html; charset=utf-8", status=200):
+    return {
+        "key": gm.fixture_key(method, url),
+        "endpoint": gm.classify_endpoint(url),
+        "status": status,
+        "headers": {"Content-Type": content_type},
+        "body": base64.b64encode(body.encode("utf-8")).decode("ascii"),
+    }
+
+
+def _ajax(content):
+    return f'<?xml version="1.0" encoding="utf-8"?><root><![CDATA[{content}]]></root>'
+
+
+def build_entries(list_pages=5, blogs_per_page=20):
+    entries = [
+        _entry("GET", FORUM + "home.php?mod=space&do=profile", "<html><body>我的资料</body></html>"),
+        _entry("GET", FORUM + "home.php?mod=spacecp", '<input type="hidden" name="formhash" value="abcdef12" />'),
+        _entry("GET", FORUM + "k_misign-sign.html?operation=qiandao&format=button&formhash=abcdef12", _ajax("签到成功")),
+        _entry("GET", FORUM + "plugin.php?id=it618_award:ajax&ac=getaward&formhash=abcdef12",
+               json.dumps({"tipname": "ok", "tipvalue": "<b>金币 10</b>"}), "application/json"),
+        _entry("GET", FORUM + "home.php?mod=spacecp&ac=credit&op=base", synthetic_credit_page()),
+        _entry("GET", FORUM + "home.php?mod=spacecp&ac=credit&op=log&suboperation=creditrulelog",
+               synthetic_rule_log_page()),
+        _entry("GET", FORUM + "space-uid-1.html", "<html><body>空间</body></html>"),
+        _entry("POST", FORUM + "home.php?mod=spacecp&ac=poke&op=send&uid=1&inajax=1", _ajax("已发送，对方下次访问时会收到通知")),
+    ]
+    uids = set()
+    for page in range(1, list_pages + 1):
+        links = []
+        for i in range(blogs_per_page):
+            blog_id = 100000 + page * 100 + i
+            uid = 2000 + blog_id % 97
+            uids.add(uid)
+            blog_url = f"{FORUM}blog-{uid}-{blog_id}.html"
+            links.append(f'<dt class="xs2"><a href="blog-{uid}-{blog_id}.html" target="_blank">日志 {blog_id}</a></dt>')
+            blog_page = synthetic_blog_page(blog_id, filler_blocks=120)
+            entries.append(_entry("GET", blog_url, blog_page))
+            entries.append(_entry("GET", gm._build_shock_click_url(blog_page), _ajax("表态成功 succeed")))
+        entries.append(_entry("GET", f"{gm.BLOG_LIST_URL}&page={page}", f"<html><body>{''.join(links)}</body></html>"))
+    for uid in sorted(uids):
+        entries.append(_entry("GET", f"{FORUM}home.php?mod=spacecp&ac=poke&op=send&uid={uid}&inajax=1",
+                              _ajax(synthetic_poke_popup(uid))))
+    return entries
+
+
+def write_fixtures(path, **kwargs):
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in build_entries(**kwargs):
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("output", help="输出的 fixtures.jsonl 路径")
+    parser.add_argument("--list-pages", type=int, default=5)
+    parser.add_argument("--blogs-per-page", type=int, default=20)
+    args = parser.parse_args()
+    write_fixtures(args.output, list_pages=args.list_pages, blogs_per_page=args.blogs_per_page)
+    print(f"已生成 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
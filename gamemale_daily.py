@@ -1,260 +1,2743 @@
+import time
+_MODULE_IMPORT_START = time.perf_counter()
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+import urllib3.exceptions
 import re
-import ddddocr
 from bs4 import BeautifulSoup
 import base64
+import codecs
+import html
 import json
-import time
 import random
 import os
+import sys
+import threading
+import asyncio
+import functools
+import queue
+import contextvars
+import contextlib
+import sqlite3
+import socket
+import hashlib
+import statistics
+import math
 import smtplib
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# ddddocr 在首次识别验证码时才导入（见 get_ocr_engine），Cookie 登录的运行无需加载 ONNX 模型
+MODULE_IMPORT_SECONDS = time.perf_counter() - _MODULE_IMPORT_START
+import email.utils
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
-# --- 配置加载与通知函数 ---
-def load_config(required=True):
+# --- 配置加载与通知函数 ---
+def load_config(required=True):
+    """
+    加载配置.
+    优先级: 环境变量 APP_CONFIG_JSON > 本地 config.json 文件.
+    若 required=False，找不到配置时返回空 dict 而非退出。
+    """
+    config_json_str = os.environ.get("APP_CONFIG_JSON")
+    if config_json_str:
+        log_notice("从环境变量 APP_CONFIG_JSON 加载配置。")
+        try:
+            return json.loads(config_json_str)
+        except json.JSONDecodeError:
+            LOG.error("环境变量 APP_CONFIG_JSON 的值不是有效的 JSON。")
+            exit(1)
+    
+    if os.path.exists("config.json"):
+        log_notice("从本地 config.json 文件加载配置。")
+        with open("config.json", "r", encoding="utf-8") as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                LOG.error("本地 config.json 文件格式无效。")
+                exit(1)
+
+    if not required:
+        log_notice("未找到 APP_CONFIG_JSON 或 config.json，将使用空基础配置（多账号模式）。")
+        return {}
+
+    LOG.error("错误：未找到配置。请设置 APP_CONFIG_JSON 环境变量或创建 config.json 文件。")
+    exit(1)
+
+_NOTIFICATION_SESSION = None
+
+
+def _notification_session():
+    """通知请求使用的会话：与论坛请求共用连接池，不携带任何账号 Cookie"""
+    global _NOTIFICATION_SESSION
+    if _NOTIFICATION_SESSION is None:
+        _NOTIFICATION_SESSION = mount_shared_transport(requests.Session())
+    return _NOTIFICATION_SESSION
+
+
+TELEGRAM_MAX_LENGTH = 4096
+WECHAT_MAX_BYTES = 2048
+EMAIL_SUBJECT = "Gamemale 每日任务完成统计"
+
+
+def split_message(message, limit, measure=len):
+    """按行把消息切成若干段，每段 measure(段) 不超过 limit；单行过长时按字符硬切"""
+    chunks, current = [], ""
+    for line in message.split("\n"):
+        while measure(line) > limit:
+            cut = limit
+            while measure(line[:cut]) > limit:
+                cut -= 1
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:cut])
+            line = line[cut:]
+        candidate = f"{current}\n{line}" if current else line
+        if current and measure(candidate) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = candidate
+    if current or not chunks:
+        chunks.append(current)
+    return chunks
+
+
+class _SmtpConnections:
+    """按 (服务器, 端口, 用户名) 复用 SMTP 连接：同一进程内的多封邮件只连接、STARTTLS、登录一次"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers = {}
+
+    def send(self, email_config, msg, recipients):
+        """在一次 SMTP 事务中把邮件投递给 recipients 中的每个地址（每个地址一条 RCPT TO）"""
+        key = (email_config["smtp_server"], email_config.get("smtp_port", 587), email_config["username"])
+        with self._lock:
+            server = self._servers.pop(key, None)
+            if server is not None:
+                try:
+                    server.noop()
+                except (smtplib.SMTPException, OSError):
+                    server.close()
+                    server = None
+            try:
+                if server is None:
+                    server = smtplib.SMTP(key[0], key[1], timeout=30)
+                    server.starttls()
+                    server.login(email_config["username"], email_config["password"])
+                server.sendmail(email_config["from"], recipients, msg.as_string())
+            except Exception:
+                # 连接状态未知，不再放回缓存；关闭套接字后交给调用方重试
+                if server is not None:
+                    server.close()
+                raise
+            self._servers[key] = server
+
+    def close(self):
+        with self._lock:
+            for server in self._servers.values():
+                try:
+                    server.quit()
+                except (smtplib.SMTPException, OSError):
+                    # 服务器已断开等情况：直接关闭套接字，不影响本次运行结果
+                    server.close()
+            self._servers.clear()
+
+
+class NotificationDispatcher:
+    """
+    通知分发器：notification.type 可以是单个渠道或渠道列表，各渠道在后台线程中同时发送，
+    失败时按指数退避重试，不阻塞任务执行。console 渠道直接输出。
+    进程结束前调用 flush() 等待尚未完成的发送。
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._futures = []
+        self._smtp = _SmtpConnections()
+
+    @staticmethod
+    def channels(notification_config):
+        types = notification_config.get("type", "console")
+        return [types] if isinstance(types, str) else list(types)
+
+    def submit(self, config, message, title=""):
+        """按配置把消息投递到所有渠道，立即返回"""
+        notification_config = config.get("notification", {})
+        if not notification_config.get("enabled", False):
+            return
+        retries = int(notification_config.get("retries", 3))
+        for channel in self.channels(notification_config):
+            sender = getattr(self, f"_send_{channel}", None)
+            if sender is None:
+                self._send_console(notification_config, message, title)
+                continue
+            if channel == "console":
+                sender(notification_config, message, title)
+                continue
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="notify")
+                self._futures.append(self._executor.submit(
+                    self._deliver, channel, sender, notification_config, message, title, retries))
+
+    def _deliver(self, channel, sender, notification_config, message, title, retries):
+        for attempt in range(retries + 1):
+            try:
+                return sender(notification_config, message, title)
+            except Exception as e:
+                if attempt >= retries:
+                    LOG.warning(f"{channel} 通知发送失败: {e}")
+                    return False
+                time.sleep(min(30.0, 2.0 * (2 ** attempt)))
+
+    def flush(self, timeout=120):
+        """等待后台发送完成并关闭复用的 SMTP 连接，输出发送结果"""
+        with self._lock:
+            futures, self._futures = self._futures, []
+        if futures:
+            done, pending = wait(futures, timeout=timeout)
+            sent = sum(1 for f in done if f.result())
+            LOG.info(f"📨 通知发送: {sent}/{len(futures)} 成功" + (f"，{len(pending)} 个超时未完成" if pending else ""))
+        self._smtp.close()
+
+    def _send_console(self, notification_config, message, title):
+        log_notice(message.replace('\n', '\n::notice::'))
+        return True
+
+    def _send_telegram(self, notification_config, message, title):
+        telegram_config = notification_config.get("telegram", {})
+        bot_token = telegram_config.get("bot_token")
+        chat_id = telegram_config.get("chat_id")
+        if not (bot_token and chat_id):
+            return False
+        telegram_url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+        for chunk in split_message(message, TELEGRAM_MAX_LENGTH):
+            payload = {"chat_id": chat_id, "text": chunk, "parse_mode": "HTML"}
+            response = _notification_session().post(telegram_url, json=payload, timeout=10)
+            response.raise_for_status()
+        LOG.info(f"Telegram通知发送成功{f' ({title})' if title else ''}")
+        return True
+
+    def _send_wechat(self, notification_config, message, title):
+        webhook = notification_config.get("wechat", {}).get("webhook")
+        if not webhook:
+            return False
+        for chunk in split_message(message, WECHAT_MAX_BYTES, measure=lambda s: len(s.encode("utf-8"))):
+            payload = {"msgtype": "text", "text": {"content": chunk}}
+            response = _notification_session().post(webhook, json=payload, timeout=10)
+            response.raise_for_status()
+            if response.json().get("errcode", 0) != 0:
+                raise RuntimeError(response.json().get("errmsg", "企业微信返回错误"))
+        LOG.info(f"企业微信通知发送成功{f' ({title})' if title else ''}")
+        return True
+
+    def _send_email(self, notification_config, message, title):
+        email_config = notification_config.get("email", {})
+        if not all(k in email_config for k in ["smtp_server", "username", "password", "from", "to"]):
+            return False
+        msg = MIMEMultipart()
+        msg['From'] = email_config["from"]
+        msg['To'] = email_config["to"]
+        msg['Subject'] = f"{EMAIL_SUBJECT} - {title}" if title else EMAIL_SUBJECT
+        text_content = message.replace('🎉', '').replace('📊', '').replace('🎰', '').replace('📈', '').replace('📋', '').replace('•', '-')
+        msg.attach(MIMEText(text_content, 'plain', 'utf-8'))
+        recipients = [addr.strip() for addr in email_config["to"].split(",") if addr.strip()]
+        self._smtp.send(email_config, msg, recipients)
+        LOG.info(f"邮箱通知发送成功{f' ({title})' if title else ''}")
+        return True
+
+
+NOTIFIER = NotificationDispatcher()
+
+
+def send_notification(config, message, title=""):
+    """发送通知消息（后台发送，运行结束前由 flush_notifications 等待完成）"""
+    NOTIFIER.submit(config, message, title)
+
+
+def flush_notifications():
+    NOTIFIER.flush()
+
+
+def notify_account_report(config, report, account_label):
+    """notification.per_account 开启时，多账号模式下每个账号完成后立即单独推送其报告"""
+    if config.get("notification", {}).get("per_account"):
+        send_notification(config, report, title=account_label)
+
+
+# --- 运行时间线：按账号记录各步骤的起止时间，导出为 Chrome trace 格式 ---
+
+class _NullSpan:
+    """追踪未启用时使用的空操作区间"""
+
+    def start(self):
+        return self
+
+    def end(self, error=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span(_NullSpan):
+    def __init__(self, tracer, name, cat, args):
+        self._tracer = tracer
+        self._name = name
+        self._cat = cat
+        self._args = args
+        self._start = None
+
+    def start(self):
+        self._start = time.perf_counter()
+        return self
+
+    __enter__ = start
+
+    def end(self, error=None):
+        if error is not None:
+            self._args["error"] = error
+        self._tracer.add(self._name, self._cat, self._start, time.perf_counter(), self._args)
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end(exc_type.__name__ if exc_type else None)
+        return False
+
+
+class RunTracer:
+    """
+    记录运行中的区间（登录、OCR、各任务、每篇日志、每个请求与每次等待），导出为 Chrome trace 格式的 JSON，
+    可在 Perfetto（ui.perfetto.dev）或 chrome://tracing 中离线打开。每个账号一个进程泳道，每个线程一条轨道。
+    未启用时 span() 返回空操作对象，不做任何记录。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._events = []
+        self._metadata = []
+        self._lanes = {}
+        self._threads = set()
+
+    def enable(self):
+        self.enabled = True
+
+    def span(self, name, cat="step", **args):
+        """返回一个区间：用作 with 语句，或调用 start() / end() 手动标记起止"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def _lane(self, thread):
+        """当前账号对应的 pid（未设置账号时为 0，即主流程），首次出现的账号与线程会写入名称元数据"""
+        account = _CURRENT_ACCOUNT.get()
+        if account not in self._lanes:
+            pid = len(self._lanes)
+            self._lanes[account] = pid
+            self._metadata.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                                   "args": {"name": account or "主流程"}})
+            self._metadata.append({"name": "process_sort_index", "ph": "M", "pid": pid, "tid": 0,
+                                   "args": {"sort_index": pid}})
+        pid = self._lanes[account]
+        if (pid, thread.ident) not in self._threads:
+            self._threads.add((pid, thread.ident))
+            self._metadata.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": thread.ident,
+                                   "args": {"name": thread.name}})
+        return pid
+
+    def add(self, name, cat, start, end, args=None):
+        """记录一个已完成的区间；start / end 为 time.perf_counter() 的读数"""
+        if not self.enabled or start is None:
+            return
+        thread = threading.current_thread()
+        task = _CURRENT_TASK.get()
+        event_args = {"task": task, **(args or {})} if task else dict(args or {})
+        with self._lock:
+            self._events.append({
+                "name": name, "cat": cat, "ph": "X", "pid": self._lane(thread), "tid": thread.ident,
+                "ts": round((start - self._origin) * 1e6, 1), "dur": round((end - start) * 1e6, 1),
+                "args": event_args,
+            })
+
+    def export(self, path):
+        """写出 Chrome trace JSON，返回记录的区间数"""
+        with self._lock:
+            events = self._metadata + self._events
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return len(events) - len(self._metadata)
+
+
+TRACER = RunTracer()
+_TRACE_FILE = None
+
+
+def traced(name, cat="step"):
+    """装饰器：把函数的每次调用记录为一个区间"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(name, cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traced_sleep(seconds, reason, stop_event=None):
+    """等待指定秒数并记录为 sleep 区间；传入 stop_event 时可被提前唤醒"""
+    with TRACER.span(reason, "sleep", seconds=round(seconds, 3)):
+        if stop_event is not None:
+            stop_event.wait(seconds)
+        else:
+            time.sleep(seconds)
+
+
+def configure_tracing(base_config):
+    """tracing.file 或环境变量 GM_TRACE_FILE 指定输出文件时启用追踪"""
+    global _TRACE_FILE
+    _TRACE_FILE = os.environ.get("GM_TRACE_FILE") or base_config.get("tracing", {}).get("file")
+    if _TRACE_FILE:
+        TRACER.enable()
+
+
+def export_trace():
+    """运行结束时写出时间线（未启用时忽略）"""
+    if not _TRACE_FILE:
+        return
+    try:
+        count = TRACER.export(_TRACE_FILE)
+        LOG.info(f"🧭 运行时间线已写入 {_TRACE_FILE}（{count} 个区间），可在 ui.perfetto.dev 或 chrome://tracing 中打开")
+    except OSError as e:
+        LOG.warning(f"写入运行时间线失败: {e}")
+
+
+# --- 并发执行支持：主机礼貌预算与按账号缓冲输出 ---
+
+class TokenBucket:
+    """
+    线程安全的令牌桶：平均每秒放行 rate 次，最多积攒 burst 个令牌（rate<=0 表示不限速）。
+    需要排队时额外加上 0~jitter/rate 秒的随机抖动，避免请求节奏过于机械。
+    """
+
+    def __init__(self, rate, burst=1, jitter=0.0, name="rate_limit"):
+        self.name = name
+        self.rate = float(rate or 0.0)
+        self.burst = max(1.0, float(burst))
+        self.jitter = max(0.0, float(jitter))
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def reserve(self):
+        """预订一个令牌，返回调用方还需等待的秒数"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            delay = -self._tokens / self.rate
+        return delay + random.uniform(0, self.jitter / self.rate)
+
+    def acquire(self, stop_event=None):
+        """取得一个令牌，必要时等待；传入 stop_event 时可被提前唤醒"""
+        delay = self.reserve()
+        if delay > 0:
+            traced_sleep(delay, self.name, stop_event)
+        return delay
+
+
+class HostPoliteness:
+    """
+    按主机限制并发请求数与请求间隔的礼貌预算。
+    每个账号持有一个实例；parent 为进程级共享实例，用于限制所有账号对同一主机的总并发。
+    """
+
+    def __init__(self, max_inflight=2, min_interval=0.0, parent=None):
+        self.max_inflight = max(1, int(max_inflight))
+        self.min_interval = max(0.0, float(min_interval))
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._intervals = {}
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.max_inflight)
+            return self._semaphores[host]
+
+    def _wait_interval(self, host):
+        if not self.min_interval:
+            return
+        with self._lock:
+            if host not in self._intervals:
+                self._intervals[host] = TokenBucket(1.0 / self.min_interval, name="host_interval")
+            bucket = self._intervals[host]
+        bucket.acquire()
+
+    def acquire(self, host):
+        if self.parent:
+            self.parent.acquire(host)
+        self._semaphore(host).acquire()
+        self._wait_interval(host)
+
+    def release(self, host):
+        self._semaphore(host).release()
+        if self.parent:
+            self.parent.release(host)
+
+
+# 进程级预算：所有账号对同一主机的总并发上限，由 main() 按配置初始化
+GLOBAL_POLITENESS = HostPoliteness(max_inflight=4)
+
+
+# --- 请求计量：在 Session 层记录每个请求的端点类别、耗时、重试、状态码与字节数 ---
+
+# (端点类别, 匹配 URL 的正则)，按顺序取第一个匹配
+ENDPOINT_CLASSES = [
+    ("sign", re.compile(r"k_misign-sign")),
+    ("lottery", re.compile(r"it618_award")),
+    ("blog_click", re.compile(r"ac=click")),
+    ("blog_list", re.compile(r"mod=space&do=blog")),
+    ("blog_page", re.compile(r"/blog-\d+-\d+\.html")),
+    ("space_visit", re.compile(r"space-uid-\d+")),
+    ("poke", re.compile(r"ac=poke")),
+    ("exchange", re.compile(r"op=exchange")),
+    ("credit_log", re.compile(r"creditrulelog")),
+    ("credit", re.compile(r"ac=credit")),
+    ("login", re.compile(r"mod=logging")),
+    ("captcha", re.compile(r"mod=seccode")),
+    ("login_check", re.compile(r"do=profile")),
+    ("formhash", re.compile(r"mod=spacecp")),
+]
+
+def classify_endpoint(url):
+    """把请求 URL 归入端点类别，用于按类别统计耗时"""
+    for name, pattern in ENDPOINT_CLASSES:
+        if pattern.search(url):
+            return name
+    return "other"
+
+
+def _percentile(sorted_values, fraction):
+    """最近秩法百分位数（sorted_values 已排序且非空）"""
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+# 当前正在执行的任务名：由 TaskGraphScheduler 设置，请求记录据此归属到任务（登录等任务外请求为 None）
+_CURRENT_TASK = contextvars.ContextVar("gamemale_current_task", default=None)
+
+
+class RequestMetrics:
+    """
+    请求计量钩子：挂到 PoliteSession.request_hooks 上，收集该账号的所有请求记录。
+    流式响应的字节数在读取完成后由读取方回填（见 fetch_blog_page）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records = []
+
+    def __call__(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def summary(self):
+        """按端点类别汇总：次数、失败数、重试数、p50/p95 耗时（毫秒）与字节数"""
+        with self._lock:
+            records = list(self.records)
+        grouped = {}
+        for record in records:
+            grouped.setdefault(record["endpoint"], []).append(record)
+        summary = {}
+        for endpoint, items in sorted(grouped.items()):
+            latencies = sorted(item["latency_ms"] for item in items)
+            summary[endpoint] = {
+                "count": len(items),
+                "errors": sum(1 for item in items if item["error"] or (item["status"] or 0) >= 400),
+                "retries": sum(1 for item in items if item["attempt"] > 0),
+                "p50_ms": round(_percentile(latencies, 0.50), 1),
+                "p95_ms": round(_percentile(latencies, 0.95), 1),
+                "total_ms": round(sum(latencies), 1),
+                "bytes": sum(item["bytes"] or 0 for item in items),
+            }
+        return summary
+
+    def by_task(self):
+        """按任务汇总请求数与字节数，任务外的请求（登录、formhash）归入 "(任务外)" """
+        with self._lock:
+            records = list(self.records)
+        totals = {}
+        for record in records:
+            entry = totals.setdefault(record.get("task") or "(任务外)", {"count": 0, "bytes": 0})
+            entry["count"] += 1
+            entry["bytes"] += record["bytes"] or 0
+        return totals
+
+    def export_json(self, path, account_label=""):
+        """把汇总与原始记录写入 JSON 文件"""
+        with self._lock:
+            records = list(self.records)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"account": account_label, "generated_at": time.time(),
+                       "summary": self.summary(), "by_task": self.by_task(), "requests": records},
+                      f, ensure_ascii=False, indent=2)
+
+
+# --- 共享传输层：所有会话共用连接池，Cookie 仍由各自的 Session 保存 ---
+
+TRANSPORT_DEFAULTS = {
+    "pool_connections": 10,
+    "pool_maxsize": 20,
+    "pool_block": False,
+    "tcp_keepalive": True,
+}
+
+
+FORUM_HOST = "www.gamemale.com"
+
+# 录制/回放匹配时忽略的查询参数：每次请求都会变化的 hash 与时间戳
+VOLATILE_QUERY_PARAMS = {"formhash", "loginhash", "seccodehash", "idhash", "hash", "update", "_"}
+
+# 录制时保留的响应头
+RECORDED_HEADERS = ("Content-Type", "Location", "Retry-After")
+
+
+def fixture_key(method, url):
+    """录制与回放共用的请求匹配键：方法 + 路径 + 排序后的稳定查询参数"""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in VOLATILE_QUERY_PARAMS)
+    return f"{method.upper()} {parts.path}?{urlencode(query)}"
+
+
+class ResponseRecorder:
+    """把论坛响应逐条追加到 <record_dir>/fixtures.jsonl，供 bench/replay_server.py 离线回放"""
+
+    def __init__(self, record_dir):
+        os.makedirs(record_dir, exist_ok=True)
+        self.path = os.path.join(record_dir, "fixtures.jsonl")
+        self._lock = threading.Lock()
+
+    def record(self, request, response):
+        if urlsplit(request.url).netloc != FORUM_HOST:
+            return
+        entry = {
+            "key": fixture_key(request.method, request.url),
+            "endpoint": classify_endpoint(request.url),
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            # 读取 content 会让流式响应在录制时一次读完，不影响调用方后续读取
+            "body": base64.b64encode(response.content).decode("ascii"),
+        }
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class SharedTransportAdapter(HTTPAdapter):
+    """
+    可在多个 Session 间共享的 HTTPAdapter：连接池（及已建立的 TCP+TLS 连接）跨账号复用。
+    Cookie 在 Session 层附加到请求上，连接本身不携带账号状态，因此各账号的 Cookie 仍然隔离。
+    replay_url 非空时论坛请求改发到该地址（本地回放服务器）；recorder 非空时录制论坛响应。
+    """
+
+    def __init__(self, tcp_keepalive=True, replay_url=None, recorder=None, **kwargs):
+        self.tcp_keepalive = tcp_keepalive
+        self.replay_url = replay_url
+        self.recorder = recorder
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        target = request
+        if self.replay_url and urlsplit(request.url).netloc == FORUM_HOST:
+            parts, base = urlsplit(request.url), urlsplit(self.replay_url)
+            target = request.copy()
+            target.url = urlunsplit((base.scheme, base.netloc, parts.path, parts.query, ""))
+        response = super().send(target, **kwargs)
+        if target is not request:
+            # 对调用方保持原始 URL：Cookie 与重定向仍按论坛域名处理
+            response.request = request
+            response.url = request.url
+        if self.recorder is not None:
+            self.recorder.record(request, response)
+        return response
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.tcp_keepalive:
+            # 开启 TCP keep-alive，空闲连接不易被中间设备静默断开
+            kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+            ]
+        super().init_poolmanager(*args, **kwargs)
+
+    def connection_stats(self):
+        """返回 (新建连接数, 经连接池发出的请求数)"""
+        created = requests_made = 0
+        for key in list(self.poolmanager.pools.keys()):
+            pool = self.poolmanager.pools.get(key)
+            if pool is not None:
+                created += pool.num_connections
+                requests_made += pool.num_requests
+        return created, requests_made
+
+
+SHARED_ADAPTER = SharedTransportAdapter()
+
+
+def configure_shared_transport(base_config):
+    """
+    按 performance.transport 配置重建共享连接池（需在创建任何会话前调用）。
+    环境变量 GM_RECORD_DIR 开启响应录制，GM_REPLAY_URL 把论坛请求改发到本地回放服务器。
+    """
+    global SHARED_ADAPTER
+    settings = {**TRANSPORT_DEFAULTS, **base_config.get("performance", {}).get("transport", {})}
+    record_dir = os.environ.get("GM_RECORD_DIR")
+    replay_url = os.environ.get("GM_REPLAY_URL")
+    if record_dir:
+        log_notice(f"录制模式：论坛响应将写入 {record_dir}/fixtures.jsonl（包含账号数据，请勿公开）")
+    if replay_url:
+        log_notice(f"回放模式：论坛请求改发到 {replay_url}")
+    SHARED_ADAPTER = SharedTransportAdapter(
+        tcp_keepalive=settings["tcp_keepalive"],
+        replay_url=replay_url,
+        recorder=ResponseRecorder(record_dir) if record_dir else None,
+        pool_connections=settings["pool_connections"],
+        pool_maxsize=settings["pool_maxsize"],
+        pool_block=settings["pool_block"],
+    )
+
+
+def mount_shared_transport(session):
+    """让会话使用共享连接池"""
+    session.mount("https://", SHARED_ADAPTER)
+    session.mount("http://", SHARED_ADAPTER)
+    return session
+
+
+def print_transport_report():
+    """输出本次运行的连接复用情况"""
+    created, requests_made = SHARED_ADAPTER.connection_stats()
+    if not requests_made:
+        return
+    reused = max(0, requests_made - created)
+    LOG.info(f"🔌 连接复用: 共 {requests_made} 个请求，新建 {created} 个连接，复用 {reused} 次 ({reused / requests_made:.0%})")
+
+
+# --- 按动作限速：取代各处硬编码的随机等待 ---
+
+# 动作名与 ENDPOINT_CLASSES 的端点类别一致；"account" 为串行模式下相邻账号的开始间隔
+RATE_LIMIT_DEFAULTS = {
+    "jitter": 0.2,
+    "blog_click": {"rate": 1.0, "burst": 2},
+    "space_visit": {"rate": 2.0, "burst": 3},
+    "poke": {"rate": 1.0, "burst": 2},
+    "account": {"rate": 0.2, "burst": 1},
+}
+
+
+def rate_limit_settings(config):
+    """合并默认值与 performance.rate_limits 配置"""
+    return {**RATE_LIMIT_DEFAULTS, **config.get("performance", {}).get("rate_limits", {})}
+
+
+class ActionRateLimiter:
+    """
+    每个账号一个实例：按 (主机, 动作) 维护令牌桶，未配置速率的动作不限速。
+    所有账号对同一主机的总节奏仍由 host_min_interval / host_max_inflight 控制。
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or dict(RATE_LIMIT_DEFAULTS)
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def _bucket(self, host, action):
+        key = (host, action)
+        with self._lock:
+            if key not in self._buckets:
+                limit = self.settings.get(action)
+                if not isinstance(limit, dict):
+                    self._buckets[key] = None
+                else:
+                    self._buckets[key] = TokenBucket(
+                        limit.get("rate", 0), limit.get("burst", 1),
+                        limit.get("jitter", self.settings.get("jitter", 0.0)), name=f"rate_limit:{action}",
+                    )
+            return self._buckets[key]
+
+    def acquire(self, host, action):
+        bucket = self._bucket(host, action)
+        return bucket.acquire() if bucket else 0.0
+
+
+ACCOUNT_START_BUCKET = TokenBucket(0)
+
+
+def configure_rate_limits(base_config):
+    """按配置初始化串行模式下的账号开始间隔"""
+    global ACCOUNT_START_BUCKET
+    settings = rate_limit_settings(base_config)
+    limit = settings.get("account") or {}
+    ACCOUNT_START_BUCKET = TokenBucket(
+        limit.get("rate", 0), limit.get("burst", 1), limit.get("jitter", settings.get("jitter", 0.0)),
+        name="account_start",
+    )
+
+
+# --- 重试策略：指数退避 + 抖动，遵守 Retry-After，按主机熔断 ---
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """主机熔断期间拒绝发出的请求"""
+
+
+class CircuitBreaker:
+    """
+    单个主机的熔断器：连续失败达到 threshold 次后熔断 cooldown 秒，期间请求直接失败；
+    冷却结束后放行一个试探请求，成功则恢复，失败则再次熔断。
+    """
+
+    def __init__(self, threshold=5, cooldown=60.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+
+    def before_request(self, host):
+        with self._lock:
+            if self._failures < self.threshold:
+                return
+            now = time.monotonic()
+            if now < self._open_until or self._probing:
+                raise CircuitOpenError(f"{host} 连续失败 {self._failures} 次，熔断中")
+            self._probing = True  # 冷却结束，放行一个试探请求
+
+    def record(self, success):
+        with self._lock:
+            self._probing = False
+            if success:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._failures >= self.threshold:
+                self._open_until = time.monotonic() + self.cooldown
+
+
+# 进程级熔断器（按主机），所有账号共享：站点整体故障时不必每个账号各自耗尽重试
+_HOST_BREAKERS = {}
+_HOST_BREAKERS_LOCK = threading.Lock()
+
+
+def get_host_breaker(host, threshold=5, cooldown=60.0):
+    with _HOST_BREAKERS_LOCK:
+        if host not in _HOST_BREAKERS:
+            _HOST_BREAKERS[host] = CircuitBreaker(threshold, cooldown)
+        return _HOST_BREAKERS[host]
+
+
+RETRY_DEFAULTS = {
+    "get_retries": 3,
+    "post_retries": 1,
+    "base_delay": 1.0,
+    "max_delay": 30.0,
+    "breaker_threshold": 5,
+    "breaker_cooldown": 60.0,
+}
+
+
+class RetryPolicy:
+    """
+    请求重试策略。
+    - GET/HEAD 等幂等请求：超时、连接错误、429 与 5xx 均可重试，预算为 get_retries。
+    - POST：只在请求确定未被服务器处理时重试（连接未能建立、429/503），预算为 post_retries，
+      读超时、发送后连接被断开等可能已生效的情况不重试，避免重复兑换等提交（签到为 GET，重复发送时站点回复已签到）。
+    - 等待时间为带抖动的指数退避（full jitter），响应带 Retry-After 时以其为准（不超过 max_delay）。
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    POST_RETRY_STATUSES = {429, 503}
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+    def __init__(self, get_retries=3, post_retries=1, base_delay=1.0, max_delay=30.0,
+                 breaker_threshold=5, breaker_cooldown=60.0):
+        self.get_retries = get_retries
+        self.post_retries = post_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(**{**RETRY_DEFAULTS, **config.get("performance", {}).get("retry", {})})
+
+    def breaker(self, host):
+        return get_host_breaker(host, self.breaker_threshold, self.breaker_cooldown)
+
+    def budget(self, method):
+        return self.get_retries if method.upper() in self.IDEMPOTENT_METHODS else self.post_retries
+
+    @staticmethod
+    def is_healthy(response):
+        """熔断器视角下主机是否正常：收到了响应且不是 5xx 或 429（与是否重试无关）"""
+        return response.status_code < 500 and response.status_code != 429
+
+    def is_retryable(self, method, response=None, exc=None):
+        idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        if exc is not None:
+            if isinstance(exc, CircuitOpenError):
+                return False
+            if idempotent:
+                return isinstance(exc, (requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+            # 只有连接尚未建立时才能确定请求未送达，POST 才可安全重试；
+            # 发送后对端断开（RemoteDisconnected 等 ProtocolError）同样是 ConnectionError，但服务器可能已处理
+            return _is_connect_failure(exc)
+        statuses = self.RETRY_STATUSES if idempotent else self.POST_RETRY_STATUSES
+        return response is not None and response.status_code in statuses
+
+    def delay(self, attempt, response=None):
+        retry_after = _parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def _is_connect_failure(exc):
+    """异常是否发生在建立连接阶段（连接超时、DNS 失败、连接被拒绝），即请求一定未发出"""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(exc, requests.exceptions.ConnectionError) or not exc.args:
+        return False
+    reason = exc.args[0]
+    if isinstance(reason, urllib3.exceptions.MaxRetryError):
+        reason = reason.reason
+    return isinstance(reason, (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError))
+
+
+def _parse_retry_after(value):
+    """解析 Retry-After（秒数或 HTTP 日期），无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class PoliteSession(requests.Session):
+    """
+    所有请求（含 get/head/post 直接调用）都经过这里：按 retry_policy 重试与熔断，
+    发出前按动作限速（rate_limiter），每次尝试前取得主机礼貌预算。request_hooks 中的每个可调用对象会在每次尝试结束后收到一条请求记录（dict）。
+    调用方可传入 max_retries 覆盖本次请求的重试预算；由多个请求组成的动作可自行取得一次令牌，
+    并以 rate_limit=False 发出其中的请求，避免同一动作被限速多次。
+    """
+
+    def __init__(self, politeness=None, retry_policy=None, rate_limiter=None):
+        super().__init__()
+        mount_shared_transport(self)
+        self.politeness = politeness or HostPoliteness(parent=GLOBAL_POLITENESS)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter or ActionRateLimiter()
+        self.request_hooks = []
+
+    def request(self, method, url, *args, max_retries=None, rate_limit=True, **kwargs):
+        host = urlsplit(url).netloc
+        policy = self.retry_policy
+        breaker = policy.breaker(host)
+        budget = policy.budget(method) if max_retries is None else max_retries
+        if rate_limit:
+            self.rate_limiter.acquire(host, classify_endpoint(url))
+        attempt = 0
+        while True:
+            response, exc = None, None
+            breaker.before_request(host)  # 熔断中直接抛出 CircuitOpenError，不计入失败
+            healthy = False
+            try:
+                response = self._attempt(method, url, attempt, *args, **kwargs)
+                healthy = policy.is_healthy(response)
+            except requests.RequestException as e:
+                exc = e
+            finally:
+                # 任何异常都记为失败，同时结束半开状态下的试探
+                breaker.record(success=healthy)
+            retryable = policy.is_retryable(method, response=response, exc=exc)
+            if not retryable or attempt >= budget:
+                if exc is not None:
+                    raise exc
+                return response
+            wait_seconds = policy.delay(attempt, response)
+            reason = exc.__class__.__name__ if exc is not None else f"状态码 {response.status_code}"
+            LOG.info(f"⚠️ 请求失败 ({reason})，{wait_seconds:.1f}s 后重试 (第{attempt + 1}/{budget}次): {urlsplit(url).path}")
+            if response is not None:
+                response.close()
+            traced_sleep(wait_seconds, "retry_backoff")
+            attempt += 1
+
+    def _attempt(self, method, url, attempt, *args, **kwargs):
+        """发出一次请求并生成请求记录"""
+        host = urlsplit(url).netloc
+        record = {
+            "method": method.upper(), "endpoint": classify_endpoint(url), "path": urlsplit(url).path,
+            "attempt": attempt, "status": None, "bytes": None, "latency_ms": None, "error": None,
+            "task": _CURRENT_TASK.get(),
+        }
+        self.politeness.acquire(host)
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            record["status"] = response.status_code
+            if not kwargs.get("stream"):
+                record["bytes"] = len(response.content)
+            response.request_record = record
+            return response
+        except Exception as e:
+            record["error"] = e.__class__.__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            record["latency_ms"] = round((end - start) * 1000, 1)
+            self.politeness.release(host)
+            TRACER.add(record["endpoint"], "http", start, end, {
+                "method": record["method"], "path": record["path"], "status": record["status"],
+                "attempt": attempt, "error": record["error"]})
+            for hook in self.request_hooks:
+                hook(record)
+
+
+_OUTPUT_BUFFER = contextvars.ContextVar("gamemale_output_buffer", default=None)
+
+
+class _OutputRouter:
+    """替换 sys.stdout：并发模式下把各账号线程中直接写 stdout 的输出（日志以外）也写入各自缓冲"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text):
+        buffer = _OUTPUT_BUFFER.get()
+        if buffer is not None:
+            buffer.append(text)
+            return len(text)
+        return self._stream.write(text)
+
+    def flush(self):
+        self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """在当前 contextvars 上下文中向线程池提交任务，保证输出缓冲等上下文跟随任务进入工作线程"""
+    ctx = contextvars.copy_context()
+    return executor.submit(ctx.run, fn, *args, **kwargs)
+
+
+# --- 日志输出：GitHub Actions 格式的控制台输出、按账号缓冲、可选 JSON Lines 文件 ---
+
+NOTICE = 25
+logging.addLevelName(NOTICE, "NOTICE")
+LOGGING_DEFAULTS = {"level": "INFO", "json_file": None, "json_level": None}
+_CURRENT_ACCOUNT = contextvars.ContextVar("gamemale_current_account", default="")
+
+LOG = logging.getLogger("gamemale")
+LOG.propagate = False
+
+
+def log_group(title):
+    """开始一个可折叠分组（GitHub Actions 的 ::group::）"""
+    LOG.info(title, extra={"annotation": "group"})
+
+
+def log_endgroup():
+    LOG.info("", extra={"annotation": "endgroup"})
+
+
+def log_notice(message, *args):
+    """需要在 Actions 摘要中突出显示的信息（::notice::）"""
+    LOG.log(NOTICE, message, *args)
+
+
+class GitHubActionsFormatter(logging.Formatter):
+    """按 GitHub Actions 工作流命令格式化：分组、notice / warning / error 注解，其余消息原样输出"""
+
+    _PREFIXES = ((logging.ERROR, "::error::"), (logging.WARNING, "::warning::"), (NOTICE, "::notice::"))
+
+    def format(self, record):
+        annotation = getattr(record, "annotation", None)
+        if annotation == "endgroup":
+            return "::endgroup::"
+        message = record.getMessage()
+        if record.exc_info:
+            message += "\n" + self.formatException(record.exc_info)
+        if annotation == "group":
+            return f"::group::{message}"
+        prefix = next((prefix for level, prefix in self._PREFIXES if record.levelno >= level), "")
+        return prefix + message
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """每条记录一行 JSON：时间、级别、账号、任务、事件类型与消息，供机器分析"""
+
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "account": _CURRENT_ACCOUNT.get(),
+            "task": _CURRENT_TASK.get(),
+            "event": getattr(record, "annotation", None) or "log",
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class ConsoleLogHandler(logging.Handler):
+    """
+    控制台输出。当前上下文设置了账号缓冲（并发 / 异步模式）时写入缓冲，由调用方在账号结束后按账号顺序整体输出；
+    否则写入当前的 sys.stdout。
+    """
+
+    def emit(self, record):
+        try:
+            line = self.format(record) + "\n"
+            buffer = _OUTPUT_BUFFER.get()
+            if buffer is not None:
+                buffer.append(line)
+            else:
+                sys.stdout.write(line)
+        except Exception:
+            self.handleError(record)
+
+
+CONSOLE_LOG_HANDLER = ConsoleLogHandler()
+CONSOLE_LOG_HANDLER.setFormatter(GitHubActionsFormatter())
+LOG.addHandler(CONSOLE_LOG_HANDLER)
+LOG.setLevel(logging.INFO)
+_JSON_LOG_HANDLER = None
+
+
+def _log_level(name):
+    level = logging.getLevelName(str(name).upper())
+    if not isinstance(level, int):
+        raise ValueError(f"未知的日志级别: {name}")
+    return level
+
+
+def configure_logging(base_config):
+    """
+    按 logging 配置设置控制台日志级别，并可选地把日志以 JSON Lines 追加写入文件。
+    环境变量 GM_LOG_LEVEL / GM_LOG_JSON 优先于配置。低于级别的记录在调用处即被丢弃，不做格式化。
+    """
+    global _JSON_LOG_HANDLER
+    settings = {**LOGGING_DEFAULTS, **base_config.get("logging", {})}
+    console_level = _log_level(os.environ.get("GM_LOG_LEVEL") or settings["level"])
+    CONSOLE_LOG_HANDLER.setLevel(console_level)
+    if _JSON_LOG_HANDLER is not None:
+        LOG.removeHandler(_JSON_LOG_HANDLER)
+        _JSON_LOG_HANDLER.close()
+        _JSON_LOG_HANDLER = None
+    effective_level = console_level
+    json_file = os.environ.get("GM_LOG_JSON") or settings["json_file"]
+    if json_file:
+        json_level = _log_level(settings["json_level"]) if settings["json_level"] else console_level
+        os.makedirs(os.path.dirname(os.path.abspath(json_file)), exist_ok=True)
+        _JSON_LOG_HANDLER = logging.FileHandler(json_file, encoding="utf-8")
+        _JSON_LOG_HANDLER.setFormatter(JsonLinesFormatter())
+        _JSON_LOG_HANDLER.setLevel(json_level)
+        LOG.addHandler(_JSON_LOG_HANDLER)
+        effective_level = min(effective_level, json_level)
+    LOG.setLevel(effective_level)
+
+
+# --- 验证码识别引擎：进程级共享，首次使用时加载 ---
+
+OCR_STATS = {"loaded": False, "import_seconds": 0.0, "load_seconds": 0.0}
+_OCR_ENGINE = None
+_OCR_INIT_LOCK = threading.Lock()
+_OCR_RUN_LOCK = threading.Lock()
+
+
+def get_ocr_engine():
+    """返回共享的 ddddocr 实例；首次调用时导入 ddddocr 并加载模型，线程安全。"""
+    global _OCR_ENGINE
+    if _OCR_ENGINE is None:
+        with _OCR_INIT_LOCK:
+            if _OCR_ENGINE is None:
+                start = time.perf_counter()
+                import ddddocr
+                imported = time.perf_counter()
+                engine = ddddocr.DdddOcr(show_ad=False)
+                TRACER.add("加载 ddddocr", "ocr", start, time.perf_counter())
+                OCR_STATS["import_seconds"] = imported - start
+                OCR_STATS["load_seconds"] = time.perf_counter() - imported
+                OCR_STATS["loaded"] = True
+                _OCR_ENGINE = engine
+                LOG.info(f"ℹ️ ddddocr 已加载 (导入 {OCR_STATS['import_seconds']:.2f}s, 模型 {OCR_STATS['load_seconds']:.2f}s)")
+    return _OCR_ENGINE
+
+
+# Discuz 默认验证码字符集（不含易混淆字符）与长度
+CAPTCHA_DEFAULTS = {
+    "charset": "BCEFGHJKMPQRTVWXY2346789",
+    "length": 4,
+    "min_confidence": 0.5,
+    "max_local_retries": 3,
+}
+
+LOGIN_METRICS = []
+_LOGIN_METRICS_LOCK = threading.Lock()
+
+
+def _decode_ocr_probability(result):
+    """
+    对 ddddocr probability=True 的输出做 CTC 贪心解码，返回 (文本, 置信度)。
+    每个时间步取最大概率的字符，合并重复并去掉空白符；置信度取输出字符概率中的最小值。
+    """
+    charsets = result["charsets"]
+    text, char_probabilities, previous = [], [], None
+    for row in result["probability"]:
+        if all(0.0 <= value <= 1.0 for value in row):
+            # 概率（限制字符集后可能只是原分布的一部分），重新归一
+            total = sum(row) or 1.0
+            row = [value / total for value in row]
+        else:
+            # 未归一化的 logits，按 softmax 归一
+            peak = max(row)
+            exps = [math.exp(value - peak) for value in row]
+            total = sum(exps)
+            row = [value / total for value in exps]
+        best = max(range(len(row)), key=row.__getitem__)
+        if best != previous and charsets[best]:
+            text.append(charsets[best])
+            char_probabilities.append(row[best])
+        previous = best
+    return "".join(text), min(char_probabilities) if char_probabilities else 0.0
+
+
+def record_login_metrics(metrics):
+    """记录一次密码登录的提交次数、识别次数、本地拒绝次数与耗时"""
+    with _LOGIN_METRICS_LOCK:
+        LOGIN_METRICS.append(metrics)
+
+
+def print_login_metrics():
+    """输出本次运行的密码登录统计（没有发生密码登录时不输出）"""
+    if not LOGIN_METRICS:
+        return
+    successes = [m for m in LOGIN_METRICS if m["success"]]
+    log_group("密码登录统计")
+    LOG.info(f"  - 密码登录: {len(LOGIN_METRICS)} 次，成功 {len(successes)} 次")
+    LOG.info(f"  - 登录提交: 共 {sum(m['posts'] for m in LOGIN_METRICS)} 次，"
+          f"验证码识别 {sum(m['ocr_runs'] for m in LOGIN_METRICS)} 次，本地拒绝 {sum(m['rejected'] for m in LOGIN_METRICS)} 次")
+    if successes:
+        LOG.info(f"  - 成功登录耗时中位数: {statistics.median(m['seconds'] for m in successes):.2f}s，"
+              f"提交次数中位数: {statistics.median(m['posts'] for m in successes)}")
+    log_endgroup()
+
+
+def print_startup_report():
+    """
+    输出启动耗时统计。OCR 未加载时说明本次运行省下的开销；
+    设置 GM_MEASURE_OCR_STARTUP=1 时会在任务结束后实际加载一次，量化节省的时间。
+    """
+    log_group("启动耗时统计")
+    LOG.info(f"  - 模块导入: {MODULE_IMPORT_SECONDS:.2f}s")
+    if OCR_STATS["loaded"]:
+        LOG.info(f"  - ddddocr: 已加载 (导入 {OCR_STATS['import_seconds']:.2f}s, 模型 {OCR_STATS['load_seconds']:.2f}s)")
+    elif os.environ.get("GM_MEASURE_OCR_STARTUP") == "1":
+        try:
+            get_ocr_engine()
+            saved = OCR_STATS["import_seconds"] + OCR_STATS["load_seconds"]
+            LOG.info(f"  - ddddocr: 本次运行未使用，按需加载共节省 {saved:.2f}s "
+                  f"(导入 {OCR_STATS['import_seconds']:.2f}s, 模型 {OCR_STATS['load_seconds']:.2f}s)")
+        except Exception as e:
+            LOG.info(f"  - ddddocr: 本次运行未使用，测量加载耗时失败: {e}")
+    else:
+        LOG.info("  - ddddocr: 本次运行未使用，已跳过导入与模型加载 (设置 GM_MEASURE_OCR_STARTUP=1 可测量节省的时间)")
+    log_endgroup()
+
+
+# --- 响应分类：预编译正则与按响应类别的标记表 ---
+
+SESSION_EXPIRED_MARKERS = ("您需要先登录才能继续本操作", "请先登录后才能继续浏览", "您还未登录")
+BLOG_INACCESSIBLE_MARKERS = ("您不能访问当前内容", "指定的主题不存在或已被删除或正在被审核")
+
+# 每类响应的判定规则 (结果, 需同时出现的标记)，按顺序取第一条满足的规则，都不满足时为 "unknown"。
+# 每类只有一到三个标记，逐个做子串查找比把全部标记合成一个正则单遍扫描更快（见 bench/bench_classifier.py）。
+RESPONSE_RULES = {
+    "sign": (("success", ("succeed",)), ("success", ("签到成功",)), ("already", ("已签",))),
+    "click": (("success", ("succeed",)), ("success", ("表态成功",)), ("already", ("您已表过态",))),
+    "poke_popup": (("already", ("今天您已经打过招呼了",)),),
+    "poke": (("success", ("已发送", "下次访问时会收到通知")),),
+    "exchange": (("success", ("积分操作成功",)),),
+    "login": (("success", ("succeed",)), ("success", ("欢迎您回来",))),
+    "login_popup": (("logged_in", ("succeedhandle_login",)), ("logged_in", ("欢迎您回来",))),
+    "login_check": (("logged_in", ("我的资料",)), ("logged_in", ("spacecp",))),
+    "session": tuple(("expired", (marker,)) for marker in SESSION_EXPIRED_MARKERS),
+    "blog_page": tuple(("inaccessible", (marker,)) for marker in BLOG_INACCESSIBLE_MARKERS),
+}
+
+BLOG_LINK_PATTERN = re.compile(r'href="[^"]*?blog-(\d+)-(\d+)\.html')
+# 只取日志链接中的作者UID：页面头部的 space-uid 链接通常是当前账号自己
+BLOG_UID_PATTERN = re.compile(r'blog-(\d+)-\d+\.html')
+CDATA_CONTENT = re.compile(r'<!\[CDATA\[(.*)\]\]>', re.S)
+CDATA_ERROR = re.compile(r'<!\[CDATA\[(.*?)(?:<script|\]\])')
+LOGINHASH_PATTERN = re.compile(r'loginhash=(\w+)')
+SECCODEHASH_PATTERN = re.compile(r"updateseccode\('([a-zA-Z0-9]+)'")
+SECCODE_IMAGE_PATTERN = re.compile(r'src="([^"]+mod=seccode[^"]+)"')
+FORMHASH_PATTERNS = (
+    re.compile(r'formhash" value="([a-f0-9]+)"'),
+    re.compile(r'formhash=([a-f0-9]+)'),
+    re.compile(r'"formhash":"([a-f0-9]+)"'),
+)
+CREDIT_ITEM_PATTERN = re.compile(r'(.+?):\s*([\d,]+\s*\S+)')
+CREDIT_ERROR_PATTERN = re.compile(r"errorhandle_credit\('([^']+)'")
+INTEGER_PATTERN = re.compile(r'-?\d+')
+HTML_TAG_PATTERN = re.compile(r'<.*?>')
+
+
+def classify_response(kind, text):
+    """按 RESPONSE_RULES[kind] 判断响应结果"""
+    for outcome, markers in RESPONSE_RULES[kind]:
+        for marker in markers:
+            if marker not in text:
+                break
+        else:
+            return outcome
+    return "unknown"
+
+
+def classify_lottery_response(response_text):
+    """判断抽奖接口的 JSON 结果，返回 (success / already / unexpected / unknown, 说明文字)"""
+    try:
+        res_json = json.loads(response_text)
+    except ValueError:
+        return "unknown", response_text[:100]
+    if not isinstance(res_json, dict):
+        return "unknown", response_text[:100]
+    tip_name = res_json.get("tipname")
+    tip_value = res_json.get("tipvalue", "")
+    if tip_name == "ok":
+        return "success", HTML_TAG_PATTERN.sub('', tip_value).strip()
+    if not tip_name:  # tipname 为空字符串 ""
+        return "already", ""
+    # 其他非预期的API返回情况，例如金币不足等
+    return "unexpected", f"{tip_name} - {tip_value}"
+
+
+def find_formhash(text):
+    """依次尝试表单字段、URL 参数与 JSON 三种写法提取 formhash"""
+    for pattern in FORMHASH_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group(1)
+    return None
+
+
+# --- HTML 提取层：热点路径只取需要的几个字段，后端可替换 ---
+
+class HtmlExtractor:
+    """
+    BeautifulSoup(html.parser) 后端，也是其它后端的行为基准。
+    每个方法只提取脚本真正需要的字段，不把 DOM 暴露给调用方。
+    """
+
+    name = "bs4"
+    # 后端依赖的顶层包名；为 None 表示无额外依赖
+    package = None
+
+    @classmethod
+    def is_missing_dependency(cls, error):
+        """ImportError 是否只因后端依赖的包未安装（包已安装但自身导入失败不算，应照常抛出）"""
+        return cls.package is not None and error.name == cls.package
+
+    def shock_button_href(self, html_text):
+        """日志页中"震惊"按钮 (id 形如 click_blogid_<id>_1) 的 href；不存在时返回 None"""
+        button = BeautifulSoup(html_text, 'html.parser').select_one('a[id*="click_blogid_"][id$="_1"]')
+        return button.get('href') if button else None
+
+    def form_action_and_formhash(self, html_text, form_id):
+        """指定 id 表单的 (action, formhash)；表单或字段不存在时对应位置为 None"""
+        form = BeautifulSoup(html_text, 'html.parser').find('form', id=form_id)
+        if not form:
+            return None, None
+        formhash_input = form.find('input', {'name': 'formhash'})
+        return form.get('action'), formhash_input.get('value') if formhash_input else None
+
+    def credit_items(self, html_text):
+        """积分页 ul.creditl 下每个 li 的文本（文本节点以空格连接）"""
+        soup = BeautifulSoup(html_text, 'html.parser')
+        return [item.get_text(" ", strip=True) for item in soup.select('ul.creditl li')]
+
+    def table_rows(self, html_text, table_class):
+        """第一个指定 class 的表格中每一行 td 的文本列表；找不到表格时返回 None"""
+        table = BeautifulSoup(html_text, 'html.parser').find('table', class_=table_class)
+        if not table:
+            return None
+        return [[cell.get_text(strip=True) for cell in row.find_all('td')] for row in table.find_all('tr')]
+
+
+class RegexHtmlExtractor(HtmlExtractor):
+    """预编译正则后端：不构建 DOM，只在原始文本中定位目标标签，无额外依赖"""
+
+    name = "regex"
+
+    _SHOCK_TAG = re.compile(r'<a\b[^>]*\bid=["\'][^"\']*click_blogid_[^"\']*_1["\'][^>]*>', re.I)
+    _HREF_ATTR = re.compile(r'\bhref=(["\'])(.*?)\1', re.I | re.S)
+    _ACTION_ATTR = re.compile(r'\baction=(["\'])(.*?)\1', re.I | re.S)
+    _VALUE_ATTR = re.compile(r'\bvalue=(["\'])(.*?)\1', re.I | re.S)
+    _FORM_TAG = re.compile(r'<form\b[^>]*\bid=["\']([^"\']*)["\'][^>]*>', re.I)
+    _FORMHASH_INPUT = re.compile(r'<input\b[^>]*\bname=["\']formhash["\'][^>]*>', re.I)
+    _CREDIT_LIST = re.compile(r'<ul\b[^>]*\bclass=["\'][^"\']*\bcreditl\b[^"\']*["\'][^>]*>(.*?)</ul>', re.I | re.S)
+    _LIST_ITEM = re.compile(r'<li\b[^>]*>(.*?)</li>', re.I | re.S)
+    _TABLE_ROW = re.compile(r'<tr\b[^>]*>(.*?)</tr>', re.I | re.S)
+    _TABLE_CELL = re.compile(r'<td\b[^>]*>(.*?)</td>', re.I | re.S)
+    _TAG = re.compile(r'<[^>]+>')
+    _SPACES = re.compile(r'\s+')
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _table_pattern(table_class):
+        return re.compile(
+            r'<table\b[^>]*\bclass=["\'][^"\']*\b%s\b[^"\']*["\'][^>]*>(.*?)</table>' % re.escape(table_class),
+            re.I | re.S)
+
+    def _attr(self, pattern, tag):
+        match = pattern.search(tag)
+        return html.unescape(match.group(2)) if match else None
+
+    def _text(self, fragment, separator):
+        # 与 bs4 的 get_text(separator, strip=True) 一致：逐个文本节点 strip 后以 separator 连接
+        parts = (html.unescape(part).strip() for part in self._TAG.split(fragment))
+        return separator.join(part for part in parts if part)
+
+    def shock_button_href(self, html_text):
+        tag = self._SHOCK_TAG.search(html_text)
+        return self._attr(self._HREF_ATTR, tag.group(0)) if tag else None
+
+    def form_action_and_formhash(self, html_text, form_id):
+        form_id = form_id.lower()
+        form_match = next((match for match in self._FORM_TAG.finditer(html_text)
+                           if match.group(1).lower() == form_id), None)
+        if not form_match:
+            return None, None
+        form_end = html_text.find('</form>', form_match.end())
+        form_body = html_text[form_match.end():form_end if form_end != -1 else len(html_text)]
+        formhash_input = self._FORMHASH_INPUT.search(form_body)
+        formhash = self._attr(self._VALUE_ATTR, formhash_input.group(0)) if formhash_input else None
+        return self._attr(self._ACTION_ATTR, form_match.group(0)), formhash
+
+    def credit_items(self, html_text):
+        credit_list = self._CREDIT_LIST.search(html_text)
+        if not credit_list:
+            return []
+        return [self._text(item, " ") for item in self._LIST_ITEM.findall(credit_list.group(1))]
+
+    def table_rows(self, html_text, table_class):
+        table_match = self._table_pattern(table_class).search(html_text)
+        if not table_match:
+            return None
+        return [[self._text(cell, "") for cell in self._TABLE_CELL.findall(row)]
+                for row in self._TABLE_ROW.findall(table_match.group(1))]
+
+
+class LxmlHtmlExtractor(HtmlExtractor):
+    """lxml 后端（需安装 lxml）：C 实现的解析器，比 html.parser 快一个数量级"""
+
+    name = "lxml"
+    package = "lxml"
+
+    def __init__(self):
+        import lxml.html
+        self._parse = lxml.html.fromstring
+
+    @staticmethod
+    def _class_xpath(tag, class_name):
+        return f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+    @staticmethod
+    def _text(node, separator):
+        return separator.join(part.strip() for part in node.itertext() if part.strip())
+
+    def shock_button_href(self, html_text):
+        hrefs = self._parse(html_text).xpath(
+            "//a[contains(@id, 'click_blogid_') and substring(@id, string-length(@id) - 1) = '_1']/@href")
+        return str(hrefs[0]) if hrefs else None
+
+    def form_action_and_formhash(self, html_text, form_id):
+        forms = self._parse(html_text).xpath("//form[@id=$form_id]", form_id=form_id)
+        if not forms:
+            return None, None
+        formhash = forms[0].xpath(".//input[@name='formhash']/@value")
+        return forms[0].get('action'), str(formhash[0]) if formhash else None
+
+    def credit_items(self, html_text):
+        items = self._parse(html_text).xpath(self._class_xpath('ul', 'creditl') + '/li')
+        return [self._text(item, " ") for item in items]
+
+    def table_rows(self, html_text, table_class):
+        tables = self._parse(html_text).xpath(self._class_xpath('table', table_class))
+        if not tables:
+            return None
+        return [[self._text(cell, "") for cell in row.xpath('./td')] for row in tables[0].iter('tr')]
+
+
+class SelectolaxHtmlExtractor(HtmlExtractor):
+    """selectolax 后端（需安装 selectolax）：基于 lexbor，解析与 CSS 选择都最快"""
+
+    name = "selectolax"
+    package = "selectolax"
+
+    def __init__(self):
+        # selectolax 1.0 移除了旧的 Modest 后端 (selectolax.parser)
+        from selectolax.lexbor import LexborHTMLParser
+        self._parse = LexborHTMLParser
+
+    def shock_button_href(self, html_text):
+        button = self._parse(html_text).css_first('a[id*="click_blogid_"][id$="_1"]')
+        return button.attributes.get('href') if button else None
+
+    def form_action_and_formhash(self, html_text, form_id):
+        form = self._parse(html_text).css_first(f'form[id="{form_id}"]')
+        if not form:
+            return None, None
+        formhash_input = form.css_first('input[name="formhash"]')
+        return form.attributes.get('action'), formhash_input.attributes.get('value') if formhash_input else None
+
+    def credit_items(self, html_text):
+        return [item.text(separator=" ", strip=True) for item in self._parse(html_text).css('ul.creditl li')]
+
+    def table_rows(self, html_text, table_class):
+        table = self._parse(html_text).css_first(f'table.{table_class}')
+        if not table:
+            return None
+        return [[cell.text(strip=True) for cell in row.css('td')] for row in table.css('tr')]
+
+
+HTML_EXTRACTOR_BACKENDS = {
+    "selectolax": SelectolaxHtmlExtractor,
+    "lxml": LxmlHtmlExtractor,
+    "regex": RegexHtmlExtractor,
+    "bs4": HtmlExtractor,
+}
+
+
+def create_html_extractor(backend="auto"):
     """
-    加载配置.
-    优先级: 环境变量 APP_CONFIG_JSON > 本地 config.json 文件.
-    若 required=False，找不到配置时返回空 dict 而非退出。
+    创建 HTML 提取器。auto 依次尝试 selectolax、lxml（已安装时），否则使用预编译正则后端；
+    指定的后端未安装时同样回退到正则后端，已安装但导入失败时照常抛出异常。
     """
-    config_json_str = os.environ.get("APP_CONFIG_JSON")
-    if config_json_str:
-        print("::notice::从环境变量 APP_CONFIG_JSON 加载配置。")
+    candidates = ["selectolax", "lxml", "regex"] if backend == "auto" else [backend, "regex"]
+    for name in candidates:
+        extractor_class = HTML_EXTRACTOR_BACKENDS.get(name)
+        if extractor_class is None:
+            LOG.warning(f"未知的 HTML 解析后端: {name}")
+            continue
         try:
-            return json.loads(config_json_str)
-        except json.JSONDecodeError:
-            print("::error::环境变量 APP_CONFIG_JSON 的值不是有效的 JSON。")
-            exit(1)
-    
-    if os.path.exists("config.json"):
-        print("::notice::从本地 config.json 文件加载配置。")
-        with open("config.json", "r", encoding="utf-8") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                print("::error::本地 config.json 文件格式无效。")
-                exit(1)
+            return extractor_class()
+        except ImportError as e:
+            if not extractor_class.is_missing_dependency(e):
+                raise
+    return RegexHtmlExtractor()
 
-    if not required:
-        print("::notice::未找到 APP_CONFIG_JSON 或 config.json，将使用空基础配置（多账号模式）。")
-        return {}
 
-    print("::error::错误：未找到配置。请设置 APP_CONFIG_JSON 环境变量或创建 config.json 文件。")
-    exit(1)
+# 进程级提取器，由 main() 按 performance.html_parser 配置初始化
+HTML_EXTRACTOR = create_html_extractor()
 
-def send_notification(config, message):
-    """发送通知消息"""
-    notification_config = config.get("notification", {})
-    if not notification_config.get("enabled", False):
-        return
 
-    notification_type = notification_config.get("type", "console")
-    
+def configure_html_extractor(base_config):
+    """按 performance.html_parser 配置选择 HTML 提取后端"""
+    global HTML_EXTRACTOR
+    HTML_EXTRACTOR = create_html_extractor(base_config.get("performance", {}).get("html_parser", "auto"))
+    LOG.info(f"ℹ️ HTML 解析后端: {HTML_EXTRACTOR.name}")
+
+
+# --- 本地状态存储：跨运行保留的账号数据 ---
+
+def get_state_dir(config):
+    """本地状态目录：环境变量 GM_STATE_DIR > performance.state_dir > .gamemale_state"""
+    state_dir = os.environ.get("GM_STATE_DIR") or config.get("performance", {}).get("state_dir", ".gamemale_state")
+    os.makedirs(state_dir, exist_ok=True)
+    return state_dir
+
+
+def account_state_key(config):
+    """账号在本地状态中的标识：用户名（或 Cookie）的哈希，避免明文写入文件名"""
+    gamemale_config = config.get("gamemale", {})
+    identity = gamemale_config.get("username") or gamemale_config.get("cookie") or "default"
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:16]
+
+
+class ReactedBlogIndex:
+    """
+    按账号记录以往已处理过的日志ID（已表态、无按钮或无法访问），存于 sqlite。
+    打开时淘汰超过 max_age_days 的记录并整体载入内存，查询不产生磁盘访问。
+    """
+
+    def __init__(self, db_path, account_key, max_age_days=30):
+        self.account_key = account_key
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reacted_blogs ("
+            "account TEXT NOT NULL, blog_id INTEGER NOT NULL, handled_at REAL NOT NULL, "
+            "PRIMARY KEY (account, blog_id)) WITHOUT ROWID"
+        )
+        cutoff = time.time() - max_age_days * 86400
+        self._conn.execute("DELETE FROM reacted_blogs WHERE handled_at < ?", (cutoff,))
+        self._conn.commit()
+        rows = self._conn.execute("SELECT blog_id FROM reacted_blogs WHERE account = ?", (account_key,))
+        self._known = {row[0] for row in rows}
+        self.loaded_count = len(self._known)
+
+    def contains(self, blog_id):
+        with self._lock:
+            return blog_id in self._known
+
+    def add(self, blog_id):
+        with self._lock:
+            if blog_id in self._known:
+                return
+            self._known.add(blog_id)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reacted_blogs (account, blog_id, handled_at) VALUES (?, ?, ?)",
+                (self.account_key, blog_id, time.time()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_reacted_blog_index(config):
+    """按 performance.reacted_index 配置打开账号的已处理日志索引；禁用或打开失败时返回 None"""
+    index_config = config.get("performance", {}).get("reacted_index", {})
+    if not index_config.get("enabled", True):
+        return None
     try:
-        if notification_type == "telegram":
-            telegram_config = notification_config.get("telegram", {})
-            bot_token = telegram_config.get("bot_token")
-            chat_id = telegram_config.get("chat_id")
-            if bot_token and chat_id:
-                telegram_url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-                payload = {"chat_id": chat_id, "text": message, "parse_mode": "HTML"}
-                requests.post(telegram_url, json=payload, timeout=10)
-                print("Telegram通知发送成功")
-
-        elif notification_type == "wechat":
-            wechat_config = notification_config.get("wechat", {})
-            webhook = wechat_config.get("webhook")
-            if webhook:
-                payload = {"msgtype": "text", "text": {"content": message}}
-                requests.post(webhook, json=payload, timeout=10)
-                print("企业微信通知发送成功")
-
-        elif notification_type == "email":
-            email_config = notification_config.get("email", {})
-            if all(k in email_config for k in ["smtp_server", "username", "password", "from", "to"]):
-                msg = MIMEMultipart()
-                msg['From'] = email_config["from"]
-                msg['To'] = email_config["to"]
-                msg['Subject'] = "Gamemale 每日任务完成统计"
-                text_content = message.replace('🎉', '').replace('📊', '').replace('🎰', '').replace('📈', '').replace('📋', '').replace('•', '-')
-                msg.attach(MIMEText(text_content, 'plain', 'utf-8'))
-                
-                server = smtplib.SMTP(email_config["smtp_server"], email_config.get("smtp_port", 587))
-                server.starttls()
-                server.login(email_config["username"], email_config["password"])
-                server.sendmail(email_config["from"], email_config["to"], msg.as_string())
-                server.quit()
-                print("邮箱通知发送成功")
-        else:
-            print("::notice::" + message.replace('\n', '\n::notice::'))
+        db_path = os.path.join(get_state_dir(config), "reacted_blogs.sqlite3")
+        index = ReactedBlogIndex(db_path, account_state_key(config), index_config.get("max_age_days", 30))
+        LOG.info(f"ℹ️ 已载入 {index.loaded_count} 条已处理日志记录")
+        return index
+    except Exception as e:
+        LOG.warning(f"打开已处理日志索引失败，将不跳过任何日志: {e}")
+        return None
+
+
+class SessionCache:
+    """
+    按账号加密保存的会话缓存：Cookie、formhash 与最后验证时间。
+    使用 cryptography 的 Fernet（AES-CBC + HMAC）加密；密钥由 GM_SESSION_CACHE_KEY
+    或账号自身的密码/Cookie 经 PBKDF2 派生，缓存文件离开对应配置无法解密。
+    """
+
+    def __init__(self, path, secret, salt, ttl_seconds):
+        from cryptography.fernet import Fernet
+        key = hashlib.pbkdf2_hmac("sha256", secret.encode("utf-8"), salt.encode("utf-8"), 200_000)
+        self._fernet = Fernet(base64.urlsafe_b64encode(key))
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+
+    def load(self):
+        """读取缓存；不存在、已过期或无法解密时返回 None"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                data = json.loads(self._fernet.decrypt(f.read()))
+        except Exception as e:
+            LOG.warning(f"会话缓存无法读取，已忽略: {e.__class__.__name__}")
+            return None
+        if time.time() - data.get("validated_at", 0) > self.ttl_seconds:
+            LOG.info("ℹ️ 会话缓存已超过有效期，重新登录。")
+            return None
+        return data
+
+    def save(self, cookie_jar, formhash):
+        cookies = [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path,
+             "expires": c.expires, "secure": c.secure}
+            for c in cookie_jar
+        ]
+        payload = json.dumps({"cookies": cookies, "formhash": formhash, "validated_at": time.time()})
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self._fernet.encrypt(payload.encode("utf-8")))
+        os.replace(tmp_path, self.path)
+
+    def invalidate(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def open_session_cache(config):
+    """按 performance.session_cache 配置创建账号的会话缓存；禁用、缺少 cryptography 或无可用密钥时返回 None"""
+    cache_config = config.get("performance", {}).get("session_cache", {})
+    if not cache_config.get("enabled", True):
+        return None
+    gamemale_config = config.get("gamemale", {})
+    secret = os.environ.get("GM_SESSION_CACHE_KEY") or gamemale_config.get("password") or gamemale_config.get("cookie")
+    if not secret:
+        return None
+    try:
+        key = account_state_key(config)
+        path = os.path.join(get_state_dir(config), f"session_{key}.bin")
+        return SessionCache(path, secret, key, cache_config.get("ttl_hours", 12) * 3600)
+    except ImportError:
+        log_notice("未安装 cryptography，会话缓存已禁用。")
+        return None
+
+
+def forum_today():
+    """论坛按北京时间（UTC+8）计算“今天”，与运行环境的时区无关"""
+    return time.strftime("%Y-%m-%d", time.gmtime(time.time() + 8 * 3600))
+
+
+def _parse_count(value):
+    match = INTEGER_PATTERN.search(str(value).replace(',', ''))
+    return int(match.group()) if match else None
+
+
+class RuleLogSnapshot:
+    """
+    按账号保存任务统计表（creditrulelog）的快照，用于只报告今天发生变化的行。
+    文件中保存最近一次读取的表格，以及今天第一次运行前的表格作为对比基线；
+    同一天多次运行时，增量始终相对于前一天最后一次的结果。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._data = json.load(f)
+        except (OSError, ValueError):
+            self._data = {}
+
+    def baseline(self):
+        """今天的对比基线 {任务名: {"count", "time"}}；没有以往快照时返回 None"""
+        if self._data.get("date") == forum_today():
+            return self._data.get("baseline")
+        return self._data.get("rows")
+
+    def diff(self, rows):
+        """为每行附上 changed 与 delta（今天增加的次数，无法计算时为 None）"""
+        baseline = self.baseline()
+        for row in rows:
+            previous = (baseline or {}).get(row["name"])
+            if previous is None:
+                row["changed"], row["delta"] = True, None
+                continue
+            before, after = _parse_count(previous["count"]), _parse_count(row["count"])
+            row["changed"] = previous["count"] != row["count"] or previous["time"] != row["time"]
+            row["delta"] = after - before if before is not None and after is not None and row["changed"] else None
+        return rows
+
+    def save(self, rows):
+        current = {row["name"]: {"count": row["count"], "time": row["time"]} for row in rows}
+        baseline = self.baseline()
+        # 没有以往快照时，以今天第一次读取的表格作为基线
+        data = {"date": forum_today(), "baseline": current if baseline is None else baseline, "rows": current}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self._data = data
+
+
+def open_rule_log_snapshot(config):
+    """按 performance.rule_log_snapshot 配置打开账号的任务统计快照；禁用时返回 None"""
+    if not config.get("performance", {}).get("rule_log_snapshot", {}).get("enabled", True):
+        return None
+    return RuleLogSnapshot(os.path.join(get_state_dir(config), f"rulelog_{account_state_key(config)}.json"))
+
+
+class DailyLedger:
+    """
+    按账号、按天（北京时间）记录已完成的任务及其结果，以及已访问空间、已打招呼的UID。
+    同一天重复运行（手动触发或失败重跑）时据此跳过已完成的工作；换日后自动清空。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if data.get("date") != forum_today():
+            data = {"date": forum_today(), "tasks": {}, "uids": {}}
+        self._data = data
+
+    def is_done(self, task_name):
+        with self._lock:
+            return task_name in self._data["tasks"]
+
+    def task_result(self, task_name):
+        with self._lock:
+            return self._data["tasks"].get(task_name)
 
+    def mark_task(self, task_name, result):
+        with self._lock:
+            self._data["tasks"][task_name] = result
+            self._save()
+
+    def uids_done(self, kind):
+        with self._lock:
+            return set(self._data["uids"].get(kind, []))
+
+    def mark_uid(self, kind, uid):
+        with self._lock:
+            done = self._data["uids"].setdefault(kind, [])
+            if str(uid) not in done:
+                done.append(str(uid))
+                self._save()
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def open_daily_ledger(config):
+    """按 performance.daily_ledger 配置打开账号当天的任务台账；禁用时返回 None"""
+    if not config.get("performance", {}).get("daily_ledger", {}).get("enabled", True):
+        return None
+    return DailyLedger(os.path.join(get_state_dir(config), f"ledger_{account_state_key(config)}.json"))
+
+
+class CandidateUidPool:
+    """
+    按账号保存的候选UID池（sqlite），供空间访问和打招呼挑选目标，无需额外请求发现用户。
+    日志列表页与日志页下载后顺带提取其中日志链接的作者UID；访问与打招呼的结果用于排序：
+    优先今天还没打过招呼、空间可访问、最近出现过的用户。超过 max_age_days 未出现的用户会被淘汰，
+    每个账号最多保留 max_size 个。
+    """
+
+    _UID_PATTERN = BLOG_UID_PATTERN
+
+    def __init__(self, db_path, account_key, max_age_days=14, max_size=500):
+        self.account_key = account_key
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS candidate_uids ("
+            "account TEXT NOT NULL, uid INTEGER NOT NULL, last_seen REAL NOT NULL, "
+            "poked_at REAL, visit_ok INTEGER, PRIMARY KEY (account, uid)) WITHOUT ROWID"
+        )
+        self._conn.execute("DELETE FROM candidate_uids WHERE last_seen < ?", (time.time() - max_age_days * 86400,))
+        self._conn.execute(
+            "DELETE FROM candidate_uids WHERE account = ? AND uid NOT IN ("
+            "SELECT uid FROM candidate_uids WHERE account = ? ORDER BY last_seen DESC LIMIT ?)",
+            (account_key, account_key, max_size),
+        )
+        self._conn.commit()
+        rows = self._conn.execute(
+            "SELECT uid, last_seen, poked_at, visit_ok FROM candidate_uids WHERE account = ?", (account_key,))
+        self._entries = {uid: [last_seen, poked_at, visit_ok] for uid, last_seen, poked_at, visit_ok in rows}
+        self.loaded_count = len(self._entries)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def add_from_text(self, text):
+        """从已下载页面中提取日志作者UID加入候选池"""
+        uids = {int(uid) for uid in self._UID_PATTERN.findall(text)}
+        if not uids:
+            return
+        now = time.time()
+        with self._lock:
+            for uid in uids:
+                self._entries.setdefault(uid, [now, None, None])[0] = now
+            self._conn.executemany(
+                "INSERT INTO candidate_uids (account, uid, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT(account, uid) DO UPDATE SET last_seen = excluded.last_seen",
+                [(self.account_key, uid, now) for uid in uids],
+            )
+            self._conn.commit()
+
+    def _update(self, uid, column, value):
+        uid = int(uid)
+        with self._lock:
+            entry = self._entries.setdefault(uid, [time.time(), None, None])
+            entry[1 if column == "poked_at" else 2] = value
+            self._conn.execute(
+                f"INSERT INTO candidate_uids (account, uid, last_seen, {column}) VALUES (?, ?, ?, ?) "
+                f"ON CONFLICT(account, uid) DO UPDATE SET {column} = excluded.{column}",
+                (self.account_key, uid, entry[0], value),
+            )
+            self._conn.commit()
+
+    def record_visit(self, uid, reachable):
+        self._update(uid, "visit_ok", 1 if reachable else 0)
+
+    def record_poke(self, uid):
+        self._update(uid, "poked_at", time.time())
+
+    def best(self, limit, exclude=()):
+        """按排序返回最多 limit 个候选UID（字符串，与日志链接中提取的UID一致）"""
+        excluded = {str(uid) for uid in exclude}
+        today_start = time.time() - (time.time() + 8 * 3600) % 86400
+        with self._lock:
+            ranked = sorted(
+                self._entries.items(),
+                key=lambda item: (
+                    bool(item[1][1] and item[1][1] >= today_start),  # 今天已打过招呼的排在最后
+                    item[1][2] == 0,                                  # 空间访问失败过的其次
+                    -item[1][0],                                      # 最近出现的优先
+                ),
+            )
+        return [str(uid) for uid, _ in ranked if str(uid) not in excluded][:limit]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_candidate_pool(config):
+    """按 performance.candidate_pool 配置打开账号的候选UID池；禁用或打开失败时返回 None"""
+    pool_config = config.get("performance", {}).get("candidate_pool", {})
+    if not pool_config.get("enabled", True):
+        return None
+    try:
+        db_path = os.path.join(get_state_dir(config), "candidate_uids.sqlite3")
+        return CandidateUidPool(db_path, account_state_key(config),
+                                pool_config.get("max_age_days", 14), pool_config.get("max_size", 500))
     except Exception as e:
-        print(f"发送通知时出错: {e}")
+        LOG.warning(f"打开候选用户池失败: {e}")
+        return None
+
+
+def _collect_candidates(candidate_pool, text):
+    """把已下载页面中的UID加入候选池（候选池未启用时忽略）"""
+    if candidate_pool is not None and text:
+        candidate_pool.add_from_text(text)
+
+
+# 是否处于登录流程中：登录自身的请求（含在复制上下文的线程中预取的验证码）不触发会话刷新，避免刷新时递归登录
+_IN_LOGIN = contextvars.ContextVar("gamemale_in_login", default=False)
+
+
+def _is_session_expired(response):
+    """响应是否表明登录状态已失效（提示需要登录，或被重定向到登录页）"""
+    if any('action=login' in r.headers.get('Location', '') for r in response.history):
+        return True
+    if response.headers.get('Content-Type', '').startswith('image/'):
+        return False
+    return classify_response("session", response.text) == "expired"
+
+
+def _remember_blog(reacted_index, blog_id):
+    """把日志记入已处理索引（索引未启用时忽略）"""
+    if reacted_index is not None and blog_id is not None:
+        reacted_index.add(blog_id)
 
-def interact_with_blogs_regex(session, target_interactions=10, max_pages_to_scan=10):
+
+BLOG_LIST_URL = 'https://www.gamemale.com/home.php?mod=space&do=blog&view=all'
+BLOG_TARGET_INTERACTIONS = 10
+RULE_LOG_URL = 'https://www.gamemale.com/home.php?mod=spacecp&ac=credit&op=log&suboperation=creditrulelog'
+
+# 空间访问：method 为 head / stream（GET 只读首块后断开）/ get（完整 GET）/ auto（按积分日志验证过的最省方式）
+SPACE_VISIT_DEFAULTS = {"method": "auto", "workers": 3}
+SPACE_VISIT_METHODS = ("head", "stream", "get")
+SPACE_VISIT_RULE = "访问别人空间"
+
+
+def _is_blog_inaccessible(page_text):
+    """日志页面是否因隐私设置或已删除而无法访问"""
+    return classify_response("blog_page", page_text) == "inaccessible"
+
+
+def _build_shock_click_url(page_text):
+    """从日志页面提取"震惊"按钮的 AJAX 点击地址；未找到按钮（已表过态或结构不同）时返回 None"""
+    click_url_raw = HTML_EXTRACTOR.shock_button_href(page_text)
+    if not click_url_raw:
+        return None
+    click_url = (click_url_raw.replace('&', '&') + '&inajax=1') if '&inajax=1' not in click_url_raw else click_url_raw.replace('&', '&')
+    if not click_url.startswith('http'):
+        click_url = "https://www.gamemale.com/" + click_url.lstrip('/')
+    return click_url
+
+
+def _classify_click_response(response_text):
+    """判断表态请求结果: success / already / unknown"""
+    return classify_response("click", response_text)
+
+
+def iter_blog_links(list_page_text, seen_blog_ids):
+    """
+    逐个产出日志列表页中尚未见过的日志 (作者UID, 日志ID)，按日志ID去重：同一日志带不同查询参数的多个链接只产出一次。
+    seen_blog_ids 为已产出日志ID的 int 集合，会被就地更新；调用方提前停止迭代时，页面其余部分不再解析。
+    """
+    for match in BLOG_LINK_PATTERN.finditer(list_page_text):
+        blog_id = int(match.group(2))
+        if blog_id not in seen_blog_ids:
+            seen_blog_ids.add(blog_id)
+            yield match.group(1), blog_id
+
+
+def blog_url(uid, blog_id):
+    """日志页面的规范地址"""
+    return f"https://www.gamemale.com/blog-{uid}-{blog_id}.html"
+
+
+class BlogFetchStats:
+    """统计日志页读取量：请求数、提前命中数、提前断开数、实际读取字节与按 Content-Length 估算的节省字节"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.matched_early = 0
+        self.closed_early = 0
+        self.bytes_read = 0
+        self.bytes_saved = 0
+
+    def record(self, bytes_read, content_length, matched_early, closed_early):
+        with self._lock:
+            self.pages += 1
+            self.bytes_read += bytes_read
+            self.matched_early += int(matched_early)
+            if closed_early:
+                self.closed_early += 1
+                if content_length:
+                    self.bytes_saved += max(0, content_length - bytes_read)
+
+    def summary(self):
+        if not self.pages:
+            return None
+        return (f"📉 日志页读取: {self.pages} 页，提前命中 {self.matched_early} 页（其中提前断开 {self.closed_early} 页），"
+                f"读取 {self.bytes_read / 1024:.0f} KiB，节省约 {self.bytes_saved / 1024:.0f} KiB")
+
+
+# 流式读取时，若剩余未读字节不超过此值则读完，让连接可以回到连接池复用；否则直接关闭连接
+STREAM_DRAIN_LIMIT = 64 * 1024
+_STREAM_SCAN_OVERLAP = 1024
+
+
+# 任务统计页中的 table.dt：流式读取到其结束标签即可停止
+RULE_LOG_TABLE_START = re.compile(r'<table\b[^>]*\bclass=["\'][^"\']*\bdt\b[^"\']*["\'][^>]*>', re.I)
+RULE_LOG_TABLE = re.compile(r'<table\b[^>]*\bclass=["\'][^"\']*\bdt\b[^"\']*["\'][^>]*>.*?</table>', re.I | re.S)
+
+
+def _wire_bytes_read(response, decoded_bytes):
+    """
+    已从网络读取的字节数，与 Content-Length 同口径（gzip/deflate 响应时为压缩后的字节）。
+    底层响应不支持 tell() 时，未压缩响应退回解码后的字节数，压缩响应返回 None（无法与 Content-Length 比较）。
+    """
+    tell = getattr(response.raw, "tell", None)
+    if tell is not None:
+        try:
+            return tell()
+        except (AttributeError, OSError, ValueError):
+            pass
+    return None if response.headers.get("Content-Encoding", "identity") != "identity" else decoded_bytes
+
+
+def fetch_text_until(session, url, stop, stats=None, chunk_size=8192, **kwargs):
+    """
+    流式获取页面文本：边下载边解码，每到达一块就以 stop(窗口文本, 窗口在全文中的起始偏移) 检查，
+    返回 True 时停止读取并返回已读取的前缀；始终未命中时读完整个页面。
+    窗口只包含新到达的部分（带少量重叠，避免标记跨块被截断）。
+    """
+    response = session.get(url, timeout=30, stream=True, **kwargs)
+    try:
+        response.raise_for_status()
+        content_length = int(response.headers.get("Content-Length") or 0) or None
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        parts = []
+        tail = ""  # 上一个窗口末尾的 _STREAM_SCAN_OVERLAP 个字符；只在返回时拼接一次全文
+        text_length = 0
+        bytes_read = 0
+        matched_early = False
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            bytes_read += len(chunk)
+            decoded = decoder.decode(chunk)
+            if not decoded:
+                continue
+            parts.append(decoded)
+            window = tail + decoded
+            window_start = text_length - len(tail)
+            text_length += len(decoded)
+            if stop(window, window_start):
+                matched_early = True
+                break
+            tail = window[-_STREAM_SCAN_OVERLAP:]
+        else:
+            parts.append(decoder.decode(b"", final=True))
+
+        # iter_content 给出的是解压后的字节，剩余量与节省量按线上字节计算；无法得知时不排空、不计节省
+        closed_early = matched_early
+        wire_bytes = _wire_bytes_read(response, bytes_read)
+        if matched_early:
+            remaining = content_length - wire_bytes if content_length and wire_bytes is not None else None
+            if remaining is not None and remaining <= STREAM_DRAIN_LIMIT:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    bytes_read += len(chunk)
+                closed_early = False
+                wire_bytes = _wire_bytes_read(response, bytes_read)
+        if wire_bytes is None:
+            wire_bytes, content_length = bytes_read, None
+        if stats is not None:
+            stats.record(wire_bytes, content_length, matched_early, closed_early)
+        record = getattr(response, "request_record", None)
+        if record is not None:
+            record["bytes"] = wire_bytes
+        return "".join(parts)
+    finally:
+        response.close()
+
+
+def fetch_blog_page(session, url, stream=True, stats=None, chunk_size=8192, **kwargs):
+    """
+    获取日志页面文本。stream=True 时边下载边扫描，一旦出现"震惊"按钮或无法访问的提示就停止读取，
+    返回已读取的页面前缀；两者都未出现时读完整个页面。其余参数原样传给 session.get。
+    """
+    if not stream:
+        page_response = session.get(url, timeout=30, **kwargs)
+        page_response.raise_for_status()
+        if stats is not None:
+            stats.record(len(page_response.content), None, False, False)
+        return page_response.text
+
+    def button_or_blocked(window, offset):
+        return _is_blog_inaccessible(window) or RegexHtmlExtractor._SHOCK_TAG.search(window) is not None
+
+    return fetch_text_until(session, url, button_or_blocked, stats=stats, chunk_size=chunk_size, **kwargs)
+
+
+def interact_with_blogs_regex(session, target_interactions=10, max_pages_to_scan=10, reacted_index=None,
+                              stream_pages=True, candidate_pool=None):
     """
     持续查找并与日志互动，直到达到目标次数。
+    提供 reacted_index 时，跳过以往运行中已处理过的日志，不再请求其页面；
+    stream_pages=True 时日志页面边下载边扫描，找到按钮或无法访问的提示即停止读取；
+    提供 candidate_pool 时，已下载的列表页与日志页中的作者UID会加入候选池。
     """
-    print("::group::任务: 开始与日志互动 (目标: 10次成功)")
+    log_group("任务: 开始与日志互动 (目标: 10次成功)")
     
     successful_user_ids = set()
     processed_user_ids = set()
-    processed_blog_urls = set()
+    processed_blog_ids = set()
+    fetch_stats = BlogFetchStats()
     
     page_num = 1
     while len(successful_user_ids) < target_interactions and page_num <= max_pages_to_scan:
-        print(f"🔄 正在扫描第 {page_num}/{max_pages_to_scan} 页以寻找新日志...")
+        LOG.info(f"🔄 正在扫描第 {page_num}/{max_pages_to_scan} 页以寻找新日志...")
         
         try:
-            base_blog_list_url = 'https://www.gamemale.com/home.php?mod=space&do=blog&view=all'
-            current_url = f"{base_blog_list_url}&page={page_num}"
+            current_url = f"{BLOG_LIST_URL}&page={page_num}"
             response = session.get(current_url, timeout=30)
             response.raise_for_status()
             
-            href_matches = re.findall(r'href="([^"]*blog-\d+-\d+\.html[^"]*)"', response.text)
-            if not href_matches:
-                print("⏹️ 在当前页未找到任何日志链接，停止扫描。")
-                break
+            _collect_candidates(candidate_pool, response.text)
 
             new_blogs_found_on_page = 0
-            for href in href_matches:
-                full_url = href if href.startswith('http') else "https://www.gamemale.com/" + href
-                if full_url in processed_blog_urls:
-                    continue
-                
+            known_blogs_skipped = 0
+            for uid, blog_id in iter_blog_links(response.text, processed_blog_ids):
                 new_blogs_found_on_page += 1
-                processed_blog_urls.add(full_url)
+                full_url = blog_url(uid, blog_id)
+                item_span = TRACER.span("日志", "blog", uid=uid, blog_id=blog_id).start()
                 
                 try:
-                    print(f"  -> 正在处理新日志... (当前成功: {len(successful_user_ids)}/{target_interactions})")
-                    uid_match = re.search(r'blog-(\d+)-', full_url)
-                    if not uid_match:
-                        print("    -> ✗ 无法从URL中解析UID，跳过。")
-                        continue
-                    
-                    uid = uid_match.group(1)
                     processed_user_ids.add(uid)
-                    
-                    page_response = session.get(full_url, timeout=30)
-                    page_response.raise_for_status()
-                    page_text = page_response.text
-                    
-                    if "您不能访问当前内容" in page_text or "指定的主题不存在或已被删除或正在被审核" in page_text:
-                        print(f"    -> ✗ 无法访问：日志有隐私设置或已删除。 (作者UID: {uid})")
+
+                    if reacted_index is not None and reacted_index.contains(blog_id):
+                        known_blogs_skipped += 1
                         continue
 
-                    shock_button = BeautifulSoup(page_text, 'html.parser').select_one('a[id*="click_blogid_"][id$="_1"]')
-                    if not shock_button:
-                        print(f"    -> ℹ️ 已表过态或页面结构不同，跳过。 (作者UID: {uid})")
+                    LOG.debug("  -> 正在处理新日志... (当前成功: %d/%d)", len(successful_user_ids), target_interactions)
+                    page_text = fetch_blog_page(session, full_url, stream=stream_pages, stats=fetch_stats)
+                    _collect_candidates(candidate_pool, page_text)
+                    
+                    if _is_blog_inaccessible(page_text):
+                        LOG.debug("    -> ✗ 无法访问：日志有隐私设置或已删除。 (作者UID: %s)", uid)
+                        _remember_blog(reacted_index, blog_id)
                         continue
 
-                    click_url_raw = shock_button.get('href')
-                    click_url = (click_url_raw.replace('&', '&') + '&inajax=1') if '&inajax=1' not in click_url_raw else click_url_raw.replace('&', '&')
-                    if not click_url.startswith('http'):
-                        click_url = "https://www.gamemale.com/" + click_url.lstrip('/')
+                    click_url = _build_shock_click_url(page_text)
+                    if not click_url:
+                        LOG.debug("    -> ℹ️ 已表过态或页面结构不同，跳过。 (作者UID: %s)", uid)
+                        _remember_blog(reacted_index, blog_id)
+                        continue
 
                     ajax_headers = {'Referer': full_url, 'X-Requested-With': 'XMLHttpRequest'}
                     click_response = session.get(click_url, headers=ajax_headers, timeout=30)
-                    response_text = click_response.text.strip()
+                    click_status = _classify_click_response(click_response.text.strip())
+                    if click_status in ("success", "already"):
+                        _remember_blog(reacted_index, blog_id)
 
-                    if 'succeed' in response_text or '表态成功' in response_text:
-                        print(f"    -> ✅ 成功点击震惊! (作者UID: {uid})")
+                    if click_status == "success":
+                        LOG.info(f"    -> ✅ 成功点击震惊! (作者UID: {uid})")
                         successful_user_ids.add(uid)
-                    elif '您已表过态' in response_text:
-                        print(f"    -> ℹ️ 您已对该日志表过态，跳过。 (作者UID: {uid})")
+                    elif click_status == "already":
+                        LOG.debug("    -> ℹ️ 您已对该日志表过态，跳过。 (作者UID: %s)", uid)
                     else:
-                        print(f"    -> ❓ 响应内容未知，跳过。 (作者UID: {uid})")
-
-                    time.sleep(random.uniform(0.5, 1.5))
+                        LOG.info(f"    -> ❓ 响应内容未知，跳过。 (作者UID: {uid})")
 
                     if len(successful_user_ids) >= target_interactions:
-                        print(f"🎉 已完成 {target_interactions} 次成功互动目标！")
+                        LOG.info(f"🎉 已完成 {target_interactions} 次成功互动目标！")
                         break # 跳出内层 for 循环
                 
                 except Exception as e:
-                    print(f"    -> ✗ 处理日志 {full_url} 时出错: {e}")
+                    LOG.info(f"    -> ✗ 处理日志 {full_url} 时出错: {e}")
+                finally:
+                    item_span.end()
+
+            if known_blogs_skipped:
+                LOG.info(f"  -> ⏭️ 跳过 {known_blogs_skipped} 篇以往已处理过的日志")
 
             if len(successful_user_ids) >= target_interactions:
                 break # 跳出外层 while 循环
 
             if new_blogs_found_on_page == 0:
-                print("⏹️ 当前页所有日志均已处理过，停止扫描。")
+                if BLOG_LINK_PATTERN.search(response.text) is None:
+                    LOG.info("⏹️ 在当前页未找到任何日志链接，停止扫描。")
+                else:
+                    LOG.info("⏹️ 当前页所有日志均已处理过，停止扫描。")
                 break
 
         except Exception as e:
-            print(f"❌ 抓取第 {page_num} 页日志列表时出错: {e}")
+            LOG.info(f"❌ 抓取第 {page_num} 页日志列表时出错: {e}")
             break # 发生严重错误时终止
             
         page_num += 1
 
     if page_num > max_pages_to_scan:
-        print(f"⚠️ 已扫描达到最大页数 ({max_pages_to_scan}页)，但未完成目标。")
+        LOG.info(f"⚠️ 已扫描达到最大页数 ({max_pages_to_scan}页)，但未完成目标。")
+
+    if fetch_stats.summary():
+        LOG.info(fetch_stats.summary())
+    LOG.info(f"日志互动完成。成功互动 {len(successful_user_ids)} 次，共处理 {len(processed_user_ids)} 个不同作者的日志。")
+    log_endgroup()
+    return list(successful_user_ids), list(processed_user_ids)
+
+BLOG_PIPELINE_DEFAULTS = {
+    "enabled": False,
+    "list_workers": 1,
+    "page_workers": 3,
+    "click_workers": 1,
+    "list_rate": 1.0,
+    "page_rate": 2.0,
+    "click_rate": 1.0,
+    "queue_size": 20,
+}
+
+_PIPELINE_DONE = object()
+
 
-    print(f"日志互动完成。成功互动 {len(successful_user_ids)} 次，共处理 {len(processed_user_ids)} 个不同作者的日志。")
-    print("::endgroup::")
+def _queue_put(q, item, stop_event):
+    """向有界队列放入元素；流水线停止后放弃，返回是否放入成功"""
+    while not stop_event.is_set():
+        try:
+            q.put(item, timeout=0.2)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _queue_get(q, stop_event):
+    """从队列取元素；流水线停止后返回结束标记"""
+    while not stop_event.is_set():
+        try:
+            return q.get(timeout=0.2)
+        except queue.Empty:
+            continue
+    return _PIPELINE_DONE
+
+
+def interact_with_blogs_pipelined(session, target_interactions=10, max_pages_to_scan=10, settings=None, reacted_index=None,
+                                  stream_pages=True, candidate_pool=None):
+    """
+    流水线版日志互动：列表页抓取 -> 日志页抓取与按钮提取 -> 提交表态，三级之间用有界队列连接，
+    每级有独立的并发数与速率限制。达到目标次数后立即停止，尚未开始的请求全部取消。
+    各级请求只受本级速率限制（list_rate / page_rate / click_rate），不再叠加会话按类别的限速。
+    返回值与 interact_with_blogs_regex 相同。
+    """
+    settings = {**BLOG_PIPELINE_DEFAULTS, **(settings or {})}
+    log_group(f"任务: 开始与日志互动 (流水线模式, 目标: {target_interactions}次成功)")
+
+    stop_event = threading.Event()
+    blog_queue = queue.Queue(maxsize=settings["queue_size"])
+    click_queue = queue.Queue(maxsize=settings["queue_size"])
+    list_limiter = TokenBucket(settings["list_rate"], name="blog_list")
+    page_limiter = TokenBucket(settings["page_rate"], name="blog_page")
+    click_limiter = TokenBucket(settings["click_rate"], name="blog_click")
+
+    state_lock = threading.Lock()
+    click_slots = threading.Condition(state_lock)
+    successful_user_ids = set()
+    processed_user_ids = set()
+    processed_blog_ids = set()
+    pending_clicks = [0]
+    fetch_stats = BlogFetchStats()
+    next_page = [1]
+    page_exhausted = [False]
+
+    def list_stage():
+        while not stop_event.is_set():
+            with state_lock:
+                if page_exhausted[0] or next_page[0] > max_pages_to_scan:
+                    return
+                page_num = next_page[0]
+                next_page[0] += 1
+            list_limiter.acquire(stop_event)
+            if stop_event.is_set():
+                return
+            LOG.info(f"🔄 正在扫描第 {page_num}/{max_pages_to_scan} 页以寻找新日志...")
+            try:
+                response = session.get(f"{BLOG_LIST_URL}&page={page_num}", timeout=30, rate_limit=False)
+                response.raise_for_status()
+            except Exception as e:
+                LOG.info(f"❌ 抓取第 {page_num} 页日志列表时出错: {e}")
+                with state_lock:
+                    page_exhausted[0] = True
+                return
+
+            _collect_candidates(candidate_pool, response.text)
+            # 链接边解析边送入下游：多个列表线程共享去重集合，取下一条时持锁
+            links = iter_blog_links(response.text, processed_blog_ids)
+            new_blogs = 0
+            known_blogs_skipped = 0
+            while True:
+                with state_lock:
+                    link = next(links, None)
+                    if link is not None and reacted_index is not None and reacted_index.contains(link[1]):
+                        processed_user_ids.add(link[0])
+                        known_blogs_skipped += 1
+                        continue
+                if link is None:
+                    break
+                new_blogs += 1
+                if not _queue_put(blog_queue, link, stop_event):
+                    return
+            if known_blogs_skipped:
+                LOG.info(f"  -> ⏭️ 第 {page_num} 页跳过 {known_blogs_skipped} 篇以往已处理过的日志")
+            if not new_blogs and not known_blogs_skipped:
+                with state_lock:
+                    page_exhausted[0] = True
+                if BLOG_LINK_PATTERN.search(response.text) is None:
+                    LOG.info("⏹️ 在当前页未找到任何日志链接，停止扫描。")
+                else:
+                    LOG.info("⏹️ 当前页所有日志均已处理过，停止扫描。")
+                return
+
+    def page_stage():
+        while True:
+            item = _queue_get(blog_queue, stop_event)
+            if item is _PIPELINE_DONE:
+                return
+            uid, blog_id = item
+            full_url = blog_url(uid, blog_id)
+            page_limiter.acquire(stop_event)
+            if stop_event.is_set():
+                return
+            with state_lock:
+                processed_user_ids.add(uid)
+            item_span = TRACER.span("日志页", "blog", uid=uid, blog_id=blog_id).start()
+            try:
+                page_text = fetch_blog_page(session, full_url, stream=stream_pages, stats=fetch_stats, rate_limit=False)
+                _collect_candidates(candidate_pool, page_text)
+                if _is_blog_inaccessible(page_text):
+                    LOG.debug("    -> ✗ 无法访问：日志有隐私设置或已删除。 (作者UID: %s)", uid)
+                    _remember_blog(reacted_index, blog_id)
+                    continue
+                click_url = _build_shock_click_url(page_text)
+                if not click_url:
+                    LOG.debug("    -> ℹ️ 已表过态或页面结构不同，跳过。 (作者UID: %s)", uid)
+                    _remember_blog(reacted_index, blog_id)
+                    continue
+            except Exception as e:
+                LOG.info(f"    -> ✗ 处理日志 {full_url} 时出错: {e}")
+                continue
+            finally:
+                item_span.end()
+            if not _queue_put(click_queue, (full_url, uid, blog_id, click_url), stop_event):
+                return
+
+    def click_stage():
+        while True:
+            item = _queue_get(click_queue, stop_event)
+            if item is _PIPELINE_DONE:
+                return
+            full_url, uid, blog_id, click_url = item
+            # 预占一个名额，保证并发点击时成功次数不会超过目标
+            with click_slots:
+                while not stop_event.is_set() and len(successful_user_ids) + pending_clicks[0] >= target_interactions:
+                    click_slots.wait(0.2)
+                if stop_event.is_set():
+                    return
+                pending_clicks[0] += 1
+            click_limiter.acquire(stop_event)
+            if stop_event.is_set():
+                with click_slots:
+                    pending_clicks[0] -= 1
+                    click_slots.notify_all()
+                return
+            item_span = TRACER.span("表态", "blog", uid=uid, blog_id=blog_id).start()
+            try:
+                ajax_headers = {'Referer': full_url, 'X-Requested-With': 'XMLHttpRequest'}
+                click_response = session.get(click_url, headers=ajax_headers, timeout=30, rate_limit=False)
+                click_status = _classify_click_response(click_response.text.strip())
+            except Exception as e:
+                LOG.info(f"    -> ✗ 处理日志 {full_url} 时出错: {e}")
+                click_status = "error"
+            item_span.end("error" if click_status == "error" else None)
+            if click_status in ("success", "already"):
+                _remember_blog(reacted_index, blog_id)
+            with click_slots:
+                pending_clicks[0] -= 1
+                if click_status == "success":
+                    successful_user_ids.add(uid)
+                    LOG.info(f"    -> ✅ 成功点击震惊! (作者UID: {uid}, 当前成功: {len(successful_user_ids)}/{target_interactions})")
+                    if len(successful_user_ids) >= target_interactions:
+                        LOG.info(f"🎉 已完成 {target_interactions} 次成功互动目标！")
+                        stop_event.set()
+                elif click_status == "already":
+                    LOG.debug("    -> ℹ️ 您已对该日志表过态，跳过。 (作者UID: %s)", uid)
+                elif click_status == "unknown":
+                    LOG.info(f"    -> ❓ 响应内容未知，跳过。 (作者UID: {uid})")
+                click_slots.notify_all()
+
+    def run_stage(executor, worker, count, downstream_queue, downstream_count):
+        """启动一级的所有工作线程，全部结束后向下游放入对应数量的结束标记"""
+        futures = [submit_in_context(executor, worker) for _ in range(count)]
+
+        def close_downstream():
+            for future in futures:
+                future.exception()
+            if downstream_queue is not None:
+                for _ in range(downstream_count):
+                    _queue_put(downstream_queue, _PIPELINE_DONE, stop_event)
+        return submit_in_context(executor, close_downstream)
+
+    list_workers = max(1, int(settings["list_workers"]))
+    page_workers = max(1, int(settings["page_workers"]))
+    click_workers = max(1, int(settings["click_workers"]))
+    total_threads = list_workers + page_workers + click_workers + 3
+    with ThreadPoolExecutor(max_workers=total_threads, thread_name_prefix="blog-pipeline") as executor:
+        stage_closers = [
+            run_stage(executor, list_stage, list_workers, blog_queue, page_workers),
+            run_stage(executor, page_stage, page_workers, click_queue, click_workers),
+            run_stage(executor, click_stage, click_workers, None, 0),
+        ]
+        for closer in stage_closers:
+            closer.result()
+        stop_event.set()
+
+    if len(successful_user_ids) < target_interactions and next_page[0] > max_pages_to_scan and not page_exhausted[0]:
+        LOG.info(f"⚠️ 已扫描达到最大页数 ({max_pages_to_scan}页)，但未完成目标。")
+
+    if fetch_stats.summary():
+        LOG.info(fetch_stats.summary())
+    LOG.info(f"日志互动完成。成功互动 {len(successful_user_ids)} 次，共处理 {len(processed_user_ids)} 个不同作者的日志。")
+    log_endgroup()
     return list(successful_user_ids), list(processed_user_ids)
 
+
+# --- 任务调度：声明式任务依赖图 ---
+
+class TaskSpec:
+    """
+    任务图中的一个节点。
+    func 接收一个 dict（依赖任务名 -> 依赖任务的返回值），返回任务结果；
+    report=False 的任务只为下游提供数据，不出现在报告的任务详情中。
+    """
+
+    def __init__(self, name, func, deps=(), report=True):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.report = report
+
+
+# 任务图中互不依赖的任务最多 3 个（签到、抽奖、日志互动），默认让它们同时进行
+TASK_WORKERS_DEFAULT = 3
+
+
+class TaskGraphScheduler:
+    """按依赖关系执行任务图：依赖全部完成的任务立即开始，互不依赖的任务并发执行，并记录每个任务的起止时间。"""
+
+    def __init__(self, specs, max_workers=3):
+        self.specs = list(specs)
+        self.max_workers = max(1, int(max_workers))
+        self.results = {}
+        self.timings = {}
+        self._output_lock = threading.Lock()
+        self._validate()
+
+    def _validate(self):
+        names = [spec.name for spec in self.specs]
+        if len(names) != len(set(names)):
+            raise ValueError("任务图中存在重名任务")
+        declared = set()
+        # 要求依赖在声明顺序中先出现，既保证无环，也让单线程执行时按声明顺序运行
+        for spec in self.specs:
+            missing = [dep for dep in spec.deps if dep not in declared]
+            if missing:
+                raise ValueError(f"任务 {spec.name} 的依赖 {missing} 未在其之前声明")
+            declared.add(spec.name)
+
+    def _run_task(self, spec):
+        # 任务并发执行时各自缓冲输出，结束后整体写出，避免不同任务的 ::group:: 块互相穿插
+        parent_buffer = _OUTPUT_BUFFER.get()
+        buffer_token = _OUTPUT_BUFFER.set([]) if self.max_workers > 1 else None
+        try:
+            return self._run_task_unbuffered(spec)
+        finally:
+            if buffer_token is not None:
+                self._flush_task_output(_OUTPUT_BUFFER.get(), parent_buffer)
+                _OUTPUT_BUFFER.reset(buffer_token)
+
+    def _run_task_unbuffered(self, spec):
+        dep_results = {dep: self.results.get(dep) for dep in spec.deps}
+        LOG.info(f"🔄 执行任务: {spec.name}")
+        start = time.time()
+        task_token = _CURRENT_TASK.set(spec.name)
+        try:
+            with TRACER.span(spec.name, "task"):
+                result = spec.func(dep_results)
+        except Exception as e:
+            LOG.info(f"❌ 任务 {spec.name} 执行异常: {e}")
+            result = None
+        finally:
+            _CURRENT_TASK.reset(task_token)
+        self.timings[spec.name] = (start, time.time())
+        return result
+
+    def _flush_task_output(self, task_buffer, parent_buffer):
+        """把一个任务的输出整体写入账号缓冲（并发 / 异步模式）或标准输出"""
+        text = "".join(task_buffer)
+        if not text:
+            return
+        with self._output_lock:
+            if parent_buffer is not None:
+                parent_buffer.append(text)
+            else:
+                sys.stdout.write(text)
+                sys.stdout.flush()
+
+    def run(self):
+        """使用线程池执行任务图，返回 {任务名: 结果}"""
+        pending = list(self.specs)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="task") as executor:
+            while pending or running:
+                # 按声明顺序提交所有依赖已完成的任务
+                for spec in list(pending):
+                    if len(running) >= self.max_workers:
+                        break
+                    if all(dep in self.results for dep in spec.deps):
+                        pending.remove(spec)
+                        running[submit_in_context(executor, self._run_task, spec)] = spec
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    spec = running.pop(future)
+                    self.results[spec.name] = future.result()
+        return self.results
+
+    async def run_async(self, call):
+        """
+        在事件循环中执行任务图。call(func, *args) 是一个协程函数，负责执行阻塞的任务函数
+        （例如 AsyncGamemaleAutomation._call）。并发数同样受 max_workers 限制。
+        """
+        slots = asyncio.Semaphore(self.max_workers)
+        futures = {}
+
+        async def run_one(spec):
+            await asyncio.gather(*(futures[dep] for dep in spec.deps))
+            async with slots:
+                self.results[spec.name] = await call(self._run_task, spec)
+
+        for spec in self.specs:
+            futures[spec.name] = asyncio.ensure_future(run_one(spec))
+        await asyncio.gather(*futures.values())
+        return self.results
+
+    def report_results(self):
+        """按声明顺序返回需要写入报告的任务结果"""
+        return {spec.name: self.results.get(spec.name) for spec in self.specs if spec.report}
+
+    def report_timings(self):
+        """按声明顺序返回所有已执行任务的起止时间"""
+        return {spec.name: self.timings[spec.name] for spec in self.specs if spec.name in self.timings}
+
+
 class GamemaleAutomation:
     """Gamemale 自动化任务客户端"""
     
-    def __init__(self, config):
+    def __init__(self, config, account_label=""):
         self.config = config
-        self.session = requests.Session()
+        self.account_label = account_label
+        self.session = PoliteSession(HostPoliteness(
+            max_inflight=config.get("performance", {}).get("account_max_inflight", 2),
+            min_interval=config.get("performance", {}).get("account_min_interval", 0.0),
+            parent=GLOBAL_POLITENESS,
+        ), retry_policy=RetryPolicy.from_config(config),
+           rate_limiter=ActionRateLimiter(rate_limit_settings(config)))
         self.formhash = None
         self.is_logged_in = False
-        self.ocr = ddddocr.DdddOcr(show_ad=False)
+        self.session_cache = open_session_cache(config)
+        self.daily_ledger = open_daily_ledger(config)
+        self.candidate_pool = open_candidate_pool(config)
+        self.space_visits_this_run = 0
+        self.request_metrics = RequestMetrics()
+        self.session.request_hooks.append(self.request_metrics)
+        self._session_lock = threading.Lock()
+        self._session_refreshed = False
+        self._session_refresh_done = threading.Event()
         
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Referer': 'https://www.gamemale.com/forum.php',
         })
     
-    def _send_request(self, method, url, max_retries=2, **kwargs):
-        """统一的请求发送方法，包含错误处理、超时重试"""
+    def _send_request(self, method, url, max_retries=None, **kwargs):
+        """
+        统一的请求发送方法：重试与熔断由会话的 RetryPolicy 负责（max_retries 可覆盖重试预算），
+        最终仍失败时抛出异常；响应表明登录失效时重新登录并重发一次。
+        """
         kwargs.setdefault('timeout', 30)
-        last_exc = None
-        for attempt in range(max_retries + 1):
-            try:
-                response = self.session.request(method, url, **kwargs)
+        try:
+            response = self.session.request(method, url, max_retries=max_retries, **kwargs)
+            response.raise_for_status()
+            if _is_session_expired(response) and self._refresh_session():
+                response = self.session.request(method, url, max_retries=max_retries, **kwargs)
                 response.raise_for_status()
-                return response
-            except requests.exceptions.Timeout as e:
-                last_exc = e
-                print(f"⚠️ 请求超时 (第{attempt+1}次): {url}")
-                if attempt < max_retries:
-                    time.sleep(2)
-            except requests.RequestException as e:
-                if e.response is not None:
-                    print(f"请求失败: {url}, 状态码: {e.response.status_code}")
-                else:
-                    print(f"请求失败: {url}, 错误: {e}")
-                raise
-        raise last_exc
+            return response
+        except requests.RequestException as e:
+            if e.response is not None:
+                LOG.info(f"请求失败: {url}, 状态码: {e.response.status_code}")
+            else:
+                LOG.info(f"请求失败: {url}, 错误: {e}")
+            raise
 
+    @traced("登录", "login")
     def login(self):
         """统一的登录管理"""
-        print("::group::登录流程")
+        token = _IN_LOGIN.set(True)
+        try:
+            return self._login()
+        finally:
+            _IN_LOGIN.reset(token)
+
+    def _login(self):
+        log_group("登录流程")
+
+        if self._restore_cached_session():
+            LOG.info("✅ 使用缓存会话，跳过登录验证与 FormHash 获取")
+            log_endgroup()
+            return True
         
         login_successful = False
         if self.config.get("gamemale", {}).get("cookie"):
             if self._login_with_cookie():
-                print("✅ Cookie 登录成功")
+                LOG.info("✅ Cookie 登录成功")
                 login_successful = True
         
         if not login_successful and self._login_with_password():
-            print("✅ 密码登录成功") 
+            LOG.info("✅ 密码登录成功") 
             login_successful = True
         
         if login_successful:
+            # FormHash 获取完成后才标记为已登录；获取失败时仍可执行任务，由 _ready_for_tasks 提示
+            if self.get_and_store_formhash():
+                self.store_session_cache()
             self.is_logged_in = True
-            self.get_and_store_formhash()
         else:
-            print("❌ 所有登录方式均失败")
+            LOG.info("❌ 所有登录方式均失败")
         
-        print("::endgroup::")
+        log_endgroup()
         return self.is_logged_in
 
+    def _restore_cached_session(self):
+        """从加密缓存恢复 Cookie 与 formhash；缓存不可用时返回 False"""
+        if not self.session_cache:
+            return False
+        cached = self.session_cache.load()
+        if not cached or not cached.get("formhash"):
+            return False
+        for cookie in cached.get("cookies", []):
+            self.session.cookies.set(
+                cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"],
+                expires=cookie.get("expires"), secure=cookie.get("secure", False),
+            )
+        self.formhash = cached["formhash"]
+        self.is_logged_in = True
+        return True
+
+    def store_session_cache(self):
+        """把当前 Cookie 与 formhash 写入加密缓存"""
+        if not self.session_cache or not self.formhash:
+            return
+        try:
+            self.session_cache.save(self.session.cookies, self.formhash)
+        except Exception as e:
+            LOG.warning(f"写入会话缓存失败: {e}")
+
+    def _refresh_session(self):
+        """
+        任务响应表明会话已失效时调用：作废缓存并重新完整登录，每个客户端最多刷新一次。
+        返回是否刷新成功（成功后调用方重发请求）。刷新期间其它线程等待刷新结束，
+        重新登录在锁外进行，登录自身的请求不会再次进入刷新。
+        """
+        if _IN_LOGIN.get():
+            return False
+        with self._session_lock:
+            if not self._session_refreshed:
+                if not self.is_logged_in:
+                    return False
+                self._session_refreshed = True
+                refreshing = True
+            else:
+                refreshing = False
+        if not refreshing:
+            # 其它线程正在或已经完成刷新，按刷新结果决定是否重发
+            self._session_refresh_done.wait()
+            return self.is_logged_in
+        try:
+            LOG.info("⚠️ 会话已失效，作废缓存并重新登录...")
+            if self.session_cache:
+                self.session_cache.invalidate()
+            self.session.cookies.clear()
+            self.is_logged_in = False
+            self.formhash = None
+            return self.login()
+        finally:
+            self._session_refresh_done.set()
+
     def _login_with_cookie(self):
         """使用Cookie尝试登录 (版本B的可靠实现)"""
         cookie_string = self.config.get("gamemale", {}).get("cookie")
@@ -275,7 +2758,7 @@ class GamemaleAutomation:
             if response.status_code == 200:
                 text = response.text
                 # 已登录的多种判断条件
-                if '我的资料' in text or 'spacecp' in text:
+                if classify_response("login_check", text) == "logged_in":
                     return True
                 if username and username.lower() in text.lower():
                     return True
@@ -284,76 +2767,94 @@ class GamemaleAutomation:
                 return False
             return False
         except Exception as e:
-            print(f"::warning::Cookie登录验证过程中出错: {e}")
+            LOG.warning(f"Cookie登录验证过程中出错: {e}")
             return False
 
+    @traced("密码登录", "login")
     def _login_with_password(self):
-        """使用密码进行登录"""
+        """
+        使用密码进行登录。
+        验证码在本地按字符集/长度/置信度筛选后才提交；提交登录请求的同时预取下一组验证码，
+        识别错误时无需再等待一轮弹窗、JS 与图片请求。
+        """
         gamemale_config = self.config.get("gamemale", {})
         username = gamemale_config.get("username")
         password = gamemale_config.get("password")
 
         if not all([username, password]):
-            print("::warning::密码登录所需信息不完整 (用户名或密码缺失)。")
+            LOG.warning("密码登录所需信息不完整 (用户名或密码缺失)。")
             return False
+
+        metrics = {"posts": 0, "ocr_runs": 0, "rejected": 0, "success": False}
+        started = time.perf_counter()
+        prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="captcha-prefetch")
+        next_challenge = None
         
         max_retries = 3
-        for attempt in range(max_retries):
-            print(f"\n尝试密码登录 ({attempt + 1}/{max_retries})...")
-            
-            try:
-                loginhash, formhash, seccodehash, seccode_verify = self._get_login_parameters()
+        try:
+            for attempt in range(max_retries):
+                LOG.info(f"\n尝试密码登录 ({attempt + 1}/{max_retries})...")
                 
-                if not all([loginhash, formhash, seccodehash, seccode_verify]):
-                    raise ValueError("获取登录参数失败")
+                try:
+                    pending, next_challenge = next_challenge, None
+                    challenge = pending.result() if pending else self._fetch_login_challenge()
+                    seccode_verify = self._solve_captcha(challenge, metrics)
+                    if not seccode_verify:
+                        raise ValueError("验证码识别失败")
 
-                login_url = f"https://www.gamemale.com/member.php?mod=logging&action=login&loginsubmit=yes&handlekey=login&loginhash={loginhash}&inajax=1"
-                payload = {
-                    'formhash': formhash,
-                    'referer': 'https://www.gamemale.com/forum.php',
-                    'loginfield': 'username',
-                    'username': username,
-                    'password': password,
-                    'questionid': gamemale_config.get("questionid", "0"),
-                    'answer': gamemale_config.get("answer", ""),
-                    'seccodehash': seccodehash,
-                    'seccodeverify': seccode_verify
-                }
+                    login_url = f"https://www.gamemale.com/member.php?mod=logging&action=login&loginsubmit=yes&handlekey=login&loginhash={challenge['loginhash']}&inajax=1"
+                    payload = {
+                        'formhash': challenge['formhash'],
+                        'referer': 'https://www.gamemale.com/forum.php',
+                        'loginfield': 'username',
+                        'username': username,
+                        'password': password,
+                        'questionid': gamemale_config.get("questionid", "0"),
+                        'answer': gamemale_config.get("answer", ""),
+                        'seccodehash': challenge['seccodehash'],
+                        'seccodeverify': seccode_verify
+                    }
+
+                    # 每组验证码绑定各自的 idhash，预取下一组不影响本次提交
+                    if attempt < max_retries - 1:
+                        next_challenge = submit_in_context(prefetch_executor, self._fetch_login_challenge)
+                    metrics["posts"] += 1
+                    login_response = self._send_request('POST', login_url, data=payload, headers={'X-Requested-With': 'XMLHttpRequest'})
+                    if classify_response("login", login_response.text) == "success":
+                        metrics["success"] = True
+                        return True
+                    else:
+                        error_match = CDATA_ERROR.search(login_response.text)
+                        raise ValueError(error_match.group(1).strip() if error_match else "未知登录错误")
                 
-                login_response = self._send_request('POST', login_url, data=payload, headers={'X-Requested-With': 'XMLHttpRequest'})
-                if 'succeed' in login_response.text or '欢迎您回来' in login_response.text:
-                    return True
-                else:
-                    error_match = re.search(r'<!\[CDATA\[(.*?)(?:<script|\]\])', login_response.text)
-                    raise ValueError(error_match.group(1).strip() if error_match else "未知登录错误")
+                except ValueError as e:
+                    if str(e) == "ALREADY_LOGGED_IN":
+                        LOG.info("✅ Cookie仍有效，密码登录步骤跳过。")
+                        metrics["success"] = True
+                        return True
+                    LOG.info(f"登录尝试失败: {e}")
+                except Exception as e:
+                    LOG.info(f"登录尝试失败: {e}")
             
-            except ValueError as e:
-                if str(e) == "ALREADY_LOGGED_IN":
-                    print("✅ Cookie仍有效，密码登录步骤跳过。")
-                    return True
-                print(f"登录尝试失败: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(random.uniform(1, 2))
-            except Exception as e:
-                print(f"登录尝试失败: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(random.uniform(1, 2))
-        
-        return False
+            return False
+        finally:
+            prefetch_executor.shutdown(wait=False, cancel_futures=True)
+            metrics["seconds"] = time.perf_counter() - started
+            record_login_metrics(metrics)
 
-    def _get_login_parameters(self):
-        """获取登录所需的动态参数和验证码"""
+    def _fetch_login_challenge(self):
+        """获取一组登录参数与验证码图片（只发请求，不做识别）"""
         ajax_headers = {'X-Requested-With': 'XMLHttpRequest'}
         login_popup_url = 'https://www.gamemale.com/member.php?mod=logging&action=login&infloat=yes&handlekey=login&inajax=1'
         response = self._send_request('GET', login_popup_url, headers=ajax_headers)
         
         # 若弹窗返回的是"已登录成功"页面（Cookie仍有效），直接视为登录成功
-        if 'succeedhandle_login' in response.text or '欢迎您回来' in response.text:
-            print("✅ 检测到已登录状态（Cookie有效），跳过密码登录流程。")
+        if classify_response("login_popup", response.text) == "logged_in":
+            LOG.info("✅ 检测到已登录状态（Cookie有效），跳过密码登录流程。")
             raise ValueError("ALREADY_LOGGED_IN")
-        html_content_match = re.search(r'<!\[CDATA\[(.*)\]\]>', response.text, re.DOTALL)
+        html_content_match = CDATA_CONTENT.search(response.text)
         if not html_content_match:
-            print(f"[DEBUG] 未找到CDATA，响应({len(response.text)}字符): {response.text[:2000]}")
+            LOG.info(f"[DEBUG] 未找到CDATA，响应({len(response.text)}字符): {response.text[:2000]}")
             raise ValueError("无法从登录弹窗响应中提取HTML内容。")
         html_content = html_content_match.group(1)
 
@@ -362,205 +2863,349 @@ class GamemaleAutomation:
         # 尝试多种方式找登录表单
         action_tag = soup.find('form', {'name': 'login'}) or soup.find('form', id='loginform') or soup.find('form')
         if not action_tag:
-            print(f"::warning::未找到任何表单，CDATA内容预览:\n{html_content[:1000]}")
+            LOG.warning(f"未找到任何表单，CDATA内容预览:\n{html_content[:1000]}")
             raise ValueError("未找到登录表单。")
         if not action_tag.has_attr('action'):
-            print(f"::warning::表单无action属性，表单HTML: {str(action_tag)[:500]}")
+            LOG.warning(f"表单无action属性，表单HTML: {str(action_tag)[:500]}")
             raise ValueError("未找到登录表单的action URL。")
         action_url = action_tag['action']
 
-        loginhash_match = re.search(r'loginhash=(\w+)', action_url)
+        loginhash_match = LOGINHASH_PATTERN.search(action_url)
         if not loginhash_match:
             raise ValueError("未找到loginhash。")
-        loginhash = loginhash_match.group(1)
 
         formhash_tag = soup.find('input', {'name': 'formhash'})
         if not formhash_tag or not formhash_tag.has_attr('value'):
             raise ValueError("未找到formhash。")
-        formhash = formhash_tag['value']
 
-        seccodehash_match = re.search(r"updateseccode\('([a-zA-Z0-9]+)'", html_content)
+        seccodehash_match = SECCODEHASH_PATTERN.search(html_content)
         if not seccodehash_match:
             raise ValueError("未找到seccodehash。")
-        seccodehash = seccodehash_match.group(1)
-        
+
+        challenge = {
+            'loginhash': loginhash_match.group(1),
+            'formhash': formhash_tag['value'],
+            'seccodehash': seccodehash_match.group(1),
+        }
+        challenge['image'] = self._fetch_captcha_image(challenge['seccodehash'])
+        return challenge
+
+    def _fetch_captcha_image(self, seccodehash):
+        """刷新指定 idhash 的验证码并下载图片；每次调用都会得到一张新的验证码"""
+        ajax_headers = {'X-Requested-With': 'XMLHttpRequest'}
         js_url = f"https://www.gamemale.com/misc.php?mod=seccode&action=update&idhash={seccodehash}&inajax=1"
         js_response = self._send_request('GET', js_url, headers=ajax_headers)
-        img_path_match = re.search(r'src="([^"]+mod=seccode[^"]+)"', js_response.text)
+        img_path_match = SECCODE_IMAGE_PATTERN.search(js_response.text)
         if not img_path_match:
             raise ValueError("无法解析验证码URL。")
         
         img_path = img_path_match.group(1).replace('&', '&')
         img_url = "https://www.gamemale.com/" + img_path
-        img_response = self._send_request('GET', img_url)
-        
-        seccode_verify = self._recognize_captcha_ddddocr(img_response.content)
-        if not seccode_verify:
-            raise ValueError("验证码识别失败")
+        return self._send_request('GET', img_url).content
 
-        return loginhash, formhash, seccodehash, seccode_verify
+    def _solve_captcha(self, challenge, metrics):
+        """
+        识别验证码：结果不符合站点字符集/长度或置信度过低时，在本地换一张图重试，
+        不为明显错误的结果浪费一次登录提交。返回识别结果或 None。
+        """
+        captcha_config = {**CAPTCHA_DEFAULTS, **self.config.get("performance", {}).get("captcha", {})}
+        for local_try in range(captcha_config["max_local_retries"] + 1):
+            if local_try:
+                challenge['image'] = self._fetch_captcha_image(challenge['seccodehash'])
+            metrics["ocr_runs"] += 1
+            code, confidence = self._recognize_captcha_ddddocr(challenge['image'], captcha_config["charset"])
+            if not code:
+                continue
+            if captcha_config["length"] and len(code) != captcha_config["length"]:
+                LOG.info(f"ℹ️ 识别结果 {code} 长度不符，换一张验证码")
+            elif confidence < captcha_config["min_confidence"]:
+                LOG.info(f"ℹ️ 识别结果 {code} 置信度 {confidence:.2f} 过低，换一张验证码")
+            else:
+                return code
+            metrics["rejected"] += 1
+        return None
 
-    def _recognize_captcha_ddddocr(self, image_bytes):
-        """使用 ddddocr 识别验证码"""
+    @traced("识别验证码", "ocr")
+    def _recognize_captcha_ddddocr(self, image_bytes, charset=None):
+        """
+        使用 ddddocr 识别验证码，返回 (结果, 置信度)。
+        提供 charset 时把输出限制在该字符集内；置信度为各字符最大概率中的最小值，
+        当前 ddddocr 版本不支持概率输出时置信度记为 1.0。
+        """
         try:
-            res = self.ocr.classification(image_bytes)
-            print(f"ddddocr 识别结果: {res}")
-            return res
+            ocr = get_ocr_engine()
+            with _OCR_RUN_LOCK:
+                if charset and hasattr(ocr, "set_ranges"):
+                    # 模型可能输出小写字母，范围同时包含大小写，识别后统一转大写
+                    ocr.set_ranges(charset + charset.lower())
+                try:
+                    res, confidence = _decode_ocr_probability(ocr.classification(image_bytes, probability=True))
+                except TypeError:
+                    res, confidence = ocr.classification(image_bytes), 1.0
+            if charset:
+                res = "".join(ch for ch in res.upper() if ch in charset)
+            LOG.info(f"ddddocr 识别结果: {res} (置信度 {confidence:.2f})")
+            return res, confidence
         except Exception as e:
-            print(f"::warning::ddddocr 识别验证码失败: {e}")
-            return None
+            LOG.warning(f"ddddocr 识别验证码失败: {e}")
+            return None, 0.0
 
+    @traced("获取 formhash", "login")
     def get_and_store_formhash(self):
         """一次性获取并存储 formhash，供所有任务复用"""
-        print("::group::获取全局 FormHash")
+        log_group("获取全局 FormHash")
         try:
             home_url = 'https://www.gamemale.com/home.php?mod=spacecp'
             response = self._send_request('GET', home_url)
-            formhash_match = re.search(r'formhash" value="([a-f0-9]+)"', response.text) or \
-                             re.search(r'formhash=([a-f0-9]+)', response.text) or \
-                             re.search(r'"formhash":"([a-f0-9]+)"', response.text)
-            
-            if formhash_match:
-                self.formhash = formhash_match.group(1)
-                print("✅ FormHash 获取成功")
+            formhash = find_formhash(response.text)
+
+            if formhash:
+                self.formhash = formhash
+                LOG.info("✅ FormHash 获取成功")
                 return True
             else:
-                print("❌ FormHash 获取失败")
+                LOG.info("❌ FormHash 获取失败")
                 return False
         except Exception as e:
-            print(f"❌ FormHash 获取异常: {e}")
+            LOG.info(f"❌ FormHash 获取异常: {e}")
             return False
         finally:
-            print("::endgroup::")
+            log_endgroup()
 
     def execute_all_tasks(self):
-        """执行所有任务并生成详细报告"""
-        if not self.is_logged_in:
-            print("❌ 未登录，无法执行任务")
+        """按任务依赖图执行所有任务并生成详细报告"""
+        if not self._ready_for_tasks():
             return None
-        
+
+        log_group("开始执行任务")
+        scheduler = TaskGraphScheduler(self.build_task_graph(), max_workers=self._task_workers())
+        scheduler.run()
+        report_message = self._finish_task_graph(scheduler)
+        log_endgroup()
+        return report_message
+
+    def _ready_for_tasks(self):
+        if not self.is_logged_in:
+            LOG.info("❌ 未登录，无法执行任务")
+            return False
         if not self.formhash:
-            print("⚠ 未能获取到有效的 formhash，任务可能失败")
-        
-        print("::group::开始执行任务")
-        task_results = {}
-        
-        tasks = [
-            ("签到", self.quick_daily_sign),
-            ("抽奖", self.quick_daily_lottery),
+            LOG.info("⚠ 未能获取到有效的 formhash，任务可能失败")
+        return True
+
+    def _task_workers(self):
+        """同一账号内可同时执行的任务数（performance.task_workers，默认 3 即任务图的最大宽度；为 1 时按声明顺序串行）"""
+        return self.config.get("performance", {}).get("task_workers", TASK_WORKERS_DEFAULT)
+
+    def build_task_graph(self):
+        """
+        声明任务及其依赖：签到、抽奖、日志互动互不依赖；空间访问和打招呼依赖日志互动得到的UID；
+        积分与兑换在所有产生奖励的任务之后执行；任务统计在兑换之后读取，反映本次运行的最终结果。
+        """
+        reward_tasks = ("签到", "抽奖", "震惊互动", "空间访问", "打招呼")
+        blog_done = lambda result: bool(result) and len(result[0]) >= BLOG_TARGET_INTERACTIONS
+        return [
+            TaskSpec("签到", self._skip_if_done("签到", lambda deps: self.quick_daily_sign())),
+            TaskSpec("抽奖", self._skip_if_done("抽奖", lambda deps: self.quick_daily_lottery())),
+            TaskSpec("震惊互动", self._skip_if_done("震惊互动", lambda deps: self.run_blog_interaction(), blog_done)),
+            TaskSpec("选择用户", lambda deps: self._select_uids_after_blogs(deps["震惊互动"]),
+                     deps=("震惊互动",), report=False),
+            TaskSpec("空间访问", lambda deps: self.quick_visit_spaces(deps["选择用户"]) if deps["选择用户"] else False,
+                     deps=("选择用户",)),
+            TaskSpec("打招呼", lambda deps: self.quick_poke_users(deps["选择用户"]) if deps["选择用户"] else False,
+                     deps=("选择用户",)),
+            TaskSpec("积分与兑换", lambda deps: self.get_user_credits_and_exchange(),
+                     deps=reward_tasks, report=False),
+            TaskSpec("任务统计", lambda deps: self.get_daily_task_summary(),
+                     deps=("积分与兑换",), report=False),
         ]
-        
-        for name, func in tasks:
-            print(f"🔄 执行任务: {name}")
-            task_results[name] = func()
-            time.sleep(random.uniform(0.5, 1))
-        
-        print("🔄 执行任务: 震惊互动")
-        successful_uids, processed_uids = interact_with_blogs_regex(self.session, 10)
-        task_results["震惊互动"] = len(successful_uids) > 0
-
-        # 独立获取用于空间访问和打招呼的UID列表
-        # 优先用震惊互动处理过的UID，不足3个时从论坛用户列表补充
-        target_uids = list(dict.fromkeys(processed_uids))[:3]  # 去重取前3
-        if len(target_uids) < 3:
-            print(f"ℹ️ 从震惊互动获取到 {len(target_uids)} 个UID，尝试从论坛补充...")
-            extra_uids = self._get_recent_user_ids(limit=10)
-            for uid in extra_uids:
-                if uid not in target_uids:
-                    target_uids.append(uid)
-                if len(target_uids) >= 3:
-                    break
 
+    def _skip_if_done(self, task_name, func, done=bool):
+        """
+        用当天台账包装任务函数：今天已完成则直接返回记录的结果；
+        否则执行任务，done(结果) 为真时记入台账（结果需可 JSON 序列化）。
+        """
+        def run(deps):
+            if self.daily_ledger is not None and self.daily_ledger.is_done(task_name):
+                LOG.info(f"⏭️ {task_name}: 今日已完成，跳过")
+                return self.daily_ledger.task_result(task_name)
+            result = func(deps)
+            if self.daily_ledger is not None and done(result):
+                self.daily_ledger.mark_task(task_name, result)
+            return result
+        return run
+
+    def _pending_uids(self, kind, user_ids, action):
+        """从目标UID中去掉今天已处理过的，返回 (待处理UID, 跳过数)"""
+        if self.daily_ledger is None:
+            return list(user_ids), 0
+        done = self.daily_ledger.uids_done(kind)
+        pending = [uid for uid in user_ids if str(uid) not in done]
+        if len(pending) < len(user_ids):
+            LOG.info(f"⏭️ 跳过今日已{action}的 {len(user_ids) - len(pending)} 个用户")
+        return pending, len(user_ids) - len(pending)
+
+    def _mark_uid_done(self, kind, uid):
+        if self.daily_ledger is not None:
+            self.daily_ledger.mark_uid(kind, uid)
+        if kind == "poke" and self.candidate_pool is not None:
+            self.candidate_pool.record_poke(uid)
+
+    def _select_uids_after_blogs(self, blog_result):
+        """从日志互动结果中选出空间访问和打招呼的目标UID"""
+        processed_uids = blog_result[1] if blog_result else []
+        target_uids = self.select_target_uids(processed_uids)
         if target_uids:
-            print(f"选择 {len(target_uids)} 个用户进行空间访问和打招呼: {target_uids}")
-            
-            print("🔄 执行任务: 空间访问")
-            task_results["空间访问"] = self.quick_visit_spaces(target_uids)
-            
-            print("🔄 执行任务: 打招呼")
-            task_results["打招呼"] = self.quick_poke_users(target_uids)
+            LOG.info(f"选择 {len(target_uids)} 个用户进行空间访问和打招呼: {target_uids}")
         else:
-            print("⚠️ 未能获取到任何用户UID，跳过空间访问和打招呼。")
-            task_results["空间访问"] = False
-            task_results["打招呼"] = False
+            LOG.info("⚠️ 未能获取到任何用户UID，跳过空间访问和打招呼。")
+        return target_uids
 
-        print("🔄 收集统计信息")
-        user_credits, exchange_result = self.get_user_credits_and_exchange()
+    def _finish_task_graph(self, scheduler):
+        """把任务图的执行结果整理为报告"""
+        self.store_session_cache()
+        task_results = scheduler.report_results()
+        blog_result = task_results.get("震惊互动")
+        task_results["震惊互动"] = bool(blog_result and blog_result[0])
+
+        user_credits, exchange_result = scheduler.results.get("积分与兑换") or ({}, None)
         if exchange_result is not None:
             task_results["血液兑换"] = exchange_result
-        
-        task_summary_data = self.get_daily_task_summary()
-        
+
+        self._verify_space_visits(scheduler.results.get("任务统计"))
         report_message = self.generate_detailed_report(
             task_results,
             user_credits=user_credits,
-            task_summary_data=task_summary_data
+            task_summary_data=scheduler.results.get("任务统计"),
+            task_timings=scheduler.report_timings(),
+            request_summary=self.request_metrics.summary(),
         )
-        
+        self.export_request_metrics()
+
         success_count = sum(1 for result in task_results.values() if result)
         total_count = len(task_results)
-        print(f"📊 任务完成: {success_count}/{total_count} 成功")
-        print("::endgroup::")
-        
+        LOG.info(f"📊 任务完成: {success_count}/{total_count} 成功")
         return report_message
 
+    def _verify_space_visits(self, task_summary_data):
+        """用任务统计中“访问别人空间”今天增加的次数核对今天的空间访问是否被计入"""
+        row = next((task for task in task_summary_data or [] if task["name"] == SPACE_VISIT_RULE), None)
+        if row is None or not self.space_visits_this_run:
+            return
+        if self.daily_ledger is not None:
+            visits_today = len(self.daily_ledger.uids_done("visit"))
+        else:
+            visits_today = self.space_visits_this_run
+        delta = row.get("delta") if row.get("changed") else 0
+        if delta is None:
+            return
+        if delta >= visits_today:
+            LOG.info(f"✅ 空间访问已计入积分日志 (今日 +{delta})")
+        else:
+            LOG.warning(f"今日空间访问 {visits_today} 次，积分日志仅增加 {delta} 次。可能已达到奖励上限，"
+                  f"也可能当前访问方式不被计入（删除状态目录中的 space_visit_method.json 可重新验证）。")
+
+    def export_request_metrics(self):
+        """把本账号的请求计量写入 <state_dir>/metrics/requests_<账号标识>.json"""
+        try:
+            metrics_dir = os.path.join(get_state_dir(self.config), "metrics")
+            os.makedirs(metrics_dir, exist_ok=True)
+            path = os.path.join(metrics_dir, f"requests_{account_state_key(self.config)}.json")
+            self.request_metrics.export_json(path, self.account_label)
+            LOG.info(f"ℹ️ 请求计量已写入 {path}")
+        except Exception as e:
+            LOG.warning(f"写入请求计量失败: {e}")
+
+    def run_blog_interaction(self, target_interactions=BLOG_TARGET_INTERACTIONS):
+        """按配置选择串行或流水线模式执行日志震惊互动，返回 (成功UID列表, 处理过的UID列表)"""
+        reacted_index = open_reacted_blog_index(self.config)
+        pipeline_settings = self.config.get("performance", {}).get("blog_pipeline", {})
+        stream_pages = self.config.get("performance", {}).get("stream_blog_pages", True)
+        try:
+            if pipeline_settings.get("enabled"):
+                return interact_with_blogs_pipelined(
+                    self.session, target_interactions, settings=pipeline_settings, reacted_index=reacted_index,
+                    stream_pages=stream_pages, candidate_pool=self.candidate_pool)
+            return interact_with_blogs_regex(
+                self.session, target_interactions, reacted_index=reacted_index, stream_pages=stream_pages,
+                candidate_pool=self.candidate_pool)
+        finally:
+            if reacted_index is not None:
+                reacted_index.close()
+
+    def select_target_uids(self, processed_uids, limit=3):
+        """
+        选出用于空间访问和打招呼的UID列表：
+        今天已有足够用户完成访问与打招呼时直接沿用（后续均会被台账跳过）；否则优先用震惊互动处理过、
+        今天还没打过招呼的UID，不足时从候选池补充，仍不足时才从论坛用户列表补充。
+        """
+        poked_today = self.daily_ledger.uids_done("poke") if self.daily_ledger is not None else set()
+        if poked_today:
+            finished_today = sorted(poked_today & self.daily_ledger.uids_done("visit"))
+            if len(finished_today) >= limit:
+                return finished_today[:limit]
+        target_uids = [uid for uid in dict.fromkeys(processed_uids) if str(uid) not in poked_today][:limit]
+        if len(target_uids) < limit and self.candidate_pool is not None and len(self.candidate_pool):
+            extra_uids = self.candidate_pool.best(limit - len(target_uids), exclude=set(target_uids) | poked_today)
+            LOG.info(f"ℹ️ 从震惊互动获取到 {len(target_uids)} 个UID，从候选池补充 {len(extra_uids)} 个")
+            target_uids.extend(extra_uids)
+        if len(target_uids) < limit:
+            LOG.info(f"ℹ️ 从震惊互动获取到 {len(target_uids)} 个UID，尝试从论坛补充...")
+            extra_uids = self._get_recent_user_ids(limit=10)
+            for uid in extra_uids:
+                if uid not in target_uids:
+                    target_uids.append(uid)
+                if len(target_uids) >= limit:
+                    break
+        return target_uids
+
     def quick_daily_sign(self):
         """快速签到"""
-        print("::group::快速签到")
+        log_group("快速签到")
         try:
             if not self.formhash: return False
             url = f"https://www.gamemale.com/k_misign-sign.html?operation=qiandao&format=button&formhash={self.formhash}"
             response = self._send_request('GET', url, headers={'X-Requested-With': 'XMLHttpRequest'})
-            text = response.text
-            if 'succeed' in text or '签到成功' in text:
-                print("✅ 签到成功")
+            outcome = classify_response("sign", response.text)
+            if outcome == "success":
+                LOG.info("✅ 签到成功")
                 return True
-            if '已签' in text:
-                print("ℹ️ 今日已签到")
+            if outcome == "already":
+                LOG.info("ℹ️ 今日已签到")
                 return True
-            print(f"⚠ 签到状态未知")
+            LOG.info(f"⚠ 签到状态未知")
             return False
         except Exception as e:
-            print(f"❌ 签到失败: {e}")
+            LOG.info(f"❌ 签到失败: {e}")
             return False
         finally:
-            print("::endgroup::")
+            log_endgroup()
 
     def quick_daily_lottery(self):
         """快速抽奖 - 使用JSON解析"""
-        print("::group::快速抽奖")
+        log_group("快速抽奖")
         try:
             if not self.formhash: return False
             url = f"https://www.gamemale.com/plugin.php?id=it618_award:ajax&ac=getaward&formhash={self.formhash}&_={int(time.time() * 1000)}"
             response = self._send_request('GET', url, headers={'X-Requested-With': 'XMLHttpRequest'})
-            
-            # 优先使用JSON解析
-            try:
-                res_json = response.json()
-                tip_name = res_json.get("tipname")
-                tip_value = res_json.get("tipvalue", "")
-    
-                if tip_name == "ok":
-                    clean_tip_value = re.sub(r'<.*?>', '', tip_value).strip()
-                    print(f"🎉 抽奖成功: {clean_tip_value}")
-                    return True
-                elif not tip_name: # tipname 为空字符串 ""
-                    print("ℹ️ 今日已抽奖")
-                    return True
-                else:
-                    # 捕获其他非预期的API返回情况，例如金币不足等
-                    print(f"❓ 抽奖返回非预期结果: {tip_name} - {tip_value}")
-                    return False
-            except (ValueError, json.JSONDecodeError):
+            outcome, detail = classify_lottery_response(response.text)
+            if outcome == "success":
+                LOG.info(f"🎉 抽奖成功: {detail}")
+                return True
+            if outcome == "already":
+                LOG.info("ℹ️ 今日已抽奖")
+                return True
+            if outcome == "unexpected":
+                LOG.info(f"❓ 抽奖返回非预期结果: {detail}")
+            else:
                 # 如果API返回的不是有效的JSON
-                print(f"❓ 抽奖结果未知，无法解析响应: {response.text[:100]}")
-                return False
-                
+                LOG.info(f"❓ 抽奖结果未知，无法解析响应: {detail}")
+            return False
+
         except Exception as e:
-            print(f"❌ 抽奖失败: {e}")
+            LOG.info(f"❌ 抽奖失败: {e}")
             return False
         finally:
-            print("::endgroup::")
+            log_endgroup()
 
     def _get_recent_user_ids(self, limit=10):
         """从论坛最近活跃用户列表获取UID，用于空间访问和打招呼的备用来源"""
@@ -570,7 +3215,7 @@ class GamemaleAutomation:
             url = 'https://www.gamemale.com/home.php?mod=space&do=blog&view=all&page=1'
             response = self._send_request('GET', url)
             # 从日志列表页提取作者UID
-            matches = re.findall(r'blog-(\d+)-\d+\.html', response.text)
+            matches = BLOG_UID_PATTERN.findall(response.text)
             seen = set()
             for uid in matches:
                 if uid not in seen:
@@ -578,60 +3223,153 @@ class GamemaleAutomation:
                     uids.append(uid)
                 if len(uids) >= limit:
                     break
-            print(f"ℹ️ 从论坛获取到 {len(uids)} 个备用UID")
+            LOG.info(f"ℹ️ 从论坛获取到 {len(uids)} 个备用UID")
         except Exception as e:
-            print(f"⚠️ 获取备用UID失败: {e}")
+            LOG.info(f"⚠️ 获取备用UID失败: {e}")
         return uids
 
+    def _visit_space(self, uid, method):
+        """按指定方式访问一次用户空间，返回 (是否成功, 说明)；请求异常直接抛出"""
+        url = f"https://www.gamemale.com/space-uid-{uid}.html"
+        if method == "stream":
+            text = fetch_text_until(self.session, url, lambda window, offset: True)
+            return classify_response("session", text) != "expired", "GET 首块"
+        response = self.session.request(method.upper(), url, allow_redirects=True, timeout=20)
+        detail = f"{method.upper()} {response.status_code}"
+        if response.history:
+            detail += f", 重定向 {len(response.history)} 次"
+        return response.status_code == 200, detail
+
+    def _space_visit_count(self):
+        """读取积分日志中“访问别人空间”的累计次数，读取失败时返回 None"""
+        try:
+            table_html = self._fetch_rule_log_table(RULE_LOG_URL)
+            for columns in (HTML_EXTRACTOR.table_rows(table_html, 'dt') or [])[1:] if table_html else []:
+                if len(columns) >= 2 and columns[0] == SPACE_VISIT_RULE:
+                    return _parse_count(columns[1])
+        except requests.RequestException as e:
+            LOG.warning(f"读取空间访问次数失败: {e}")
+        return None
+
+    def _resolve_space_visit_method(self, configured, probe_uid):
+        """
+        确定访问方式。auto 时使用状态目录中记录的、经积分日志验证过的方式；没有记录时用 probe_uid
+        依次尝试 head、stream，以积分日志次数增加为准，并记录结果。返回 (方式, probe_uid 是否已访问成功)。
+        """
+        if configured in SPACE_VISIT_METHODS:
+            return configured, False
+        learned_path = os.path.join(get_state_dir(self.config), "space_visit_method.json")
+        try:
+            with open(learned_path, encoding="utf-8") as f:
+                return json.load(f)["method"], False
+        except (OSError, ValueError, KeyError):
+            pass
+
+        before = self._space_visit_count()
+        if before is None:
+            LOG.info("ℹ️ 积分日志中没有空间访问记录，无法验证访问方式，本次使用 stream")
+            return "stream", False
+        for method in ("head", "stream"):
+            try:
+                visited, detail = self._visit_space(probe_uid, method)
+            except (requests.RequestException, OSError) as e:
+                LOG.info(f"ℹ️ {method} 方式访问失败 ({e.__class__.__name__})，尝试下一种方式")
+                continue
+            after = self._space_visit_count()
+            if visited and after is not None and after > before:
+                LOG.info(f"✅ 已验证 {method} 方式的空间访问会被积分日志记录 ({before} → {after})")
+                try:
+                    with open(learned_path, "w", encoding="utf-8") as f:
+                        json.dump({"method": method, "verified_at": time.time()}, f)
+                except OSError as e:
+                    LOG.warning(f"记录空间访问方式失败: {e}")
+                return method, True
+            LOG.info(f"ℹ️ {method} 方式访问后积分日志未增加 ({detail})")
+        # 两种方式都未计入（可能已达到每日奖励上限），本次使用 stream，下次运行再验证
+        return "stream", False
+
     def quick_visit_spaces(self, user_ids):
-        """快速空间访问"""
+        """
+        空间访问：按 performance.space_visit 选择的方式在线程池中并发访问（速率由 rate_limits.space_visit 控制），
+        输出每次访问的耗时与结果。
+        """
         if not user_ids: return True
-        print("::group::空间访问")
-        success = 0
-        for uid in user_ids:
-            try:
-                url = f"https://www.gamemale.com/space-uid-{uid}.html"
-                if self.session.head(url, allow_redirects=True, timeout=20).status_code == 200:
-                    success += 1
-                time.sleep(0.5)
-            except: pass
-        print(f"  ✅ 空间访问: {success}/{len(user_ids)} 成功")
-        print("::endgroup::")
+        log_group("空间访问")
+        try:
+            return self._visit_spaces(user_ids)
+        finally:
+            log_endgroup()
+
+    def _visit_spaces(self, user_ids):
+        pending, skipped = self._pending_uids("visit", user_ids, "访问")
+        settings = {**SPACE_VISIT_DEFAULTS, **self.config.get("performance", {}).get("space_visit", {})}
+        visited_now = 0
+        if pending:
+            method, probe_visited = self._resolve_space_visit_method(settings["method"], pending[0])
+            if probe_visited:
+                self._record_space_visit(pending[0], True)
+                visited_now += 1
+                pending = pending[1:]
+            LOG.info(f"ℹ️ 空间访问方式: {method}")
+
+            def visit(uid):
+                start = time.perf_counter()
+                try:
+                    visited, detail = self._visit_space(uid, method)
+                except (requests.RequestException, OSError) as e:
+                    visited, detail = False, e.__class__.__name__
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                LOG.info(f"  {'✅' if visited else '❌'} UID {uid}: {elapsed_ms:.0f} ms ({detail})")
+                self._record_space_visit(uid, visited)
+                return visited
+
+            workers = max(1, min(int(settings["workers"]), len(pending) or 1))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="space-visit") as executor:
+                futures = [submit_in_context(executor, visit, uid) for uid in pending]
+                visited_now += sum(1 for future in futures if future.result())
+        self.space_visits_this_run += visited_now
+        success = skipped + visited_now
+        LOG.info(f"  ✅ 空间访问: {success}/{len(user_ids)} 成功")
         return success > 0
 
+    def _record_space_visit(self, uid, visited):
+        if self.candidate_pool is not None:
+            self.candidate_pool.record_visit(uid, visited)
+        if visited:
+            self._mark_uid_done("visit", uid)
+
     def quick_poke_users(self, user_ids):
         """对一组用户执行"打招呼"操作"""
         if not user_ids: return True
-        print("::group::打招呼")
-        success_count = 0
-        for uid in user_ids:
+        log_group("打招呼")
+        pending, success_count = self._pending_uids("poke", user_ids, "打招呼")
+        for uid in pending:
             try:
-                print(f"--- 正在对 UID: {uid} 打招呼 ---")
+                LOG.info(f"--- 正在对 UID: {uid} 打招呼 ---")
                 get_url = f"https://www.gamemale.com/home.php?mod=spacecp&ac=poke&op=send&uid={uid}&inajax=1"
                 headers = {'X-Requested-With': 'XMLHttpRequest'}
-                response = self._send_request('GET', get_url, headers=headers)
+                # 弹窗与提交的 URL 都属于 poke 类别：每个用户只取一次令牌，两个请求都不再经会话限速
+                self.session.rate_limiter.acquire(urlsplit(get_url).netloc, "poke")
+                response = self._send_request('GET', get_url, headers=headers, rate_limit=False)
                 
-                if '今天您已经打过招呼了' in response.text:
-                    print(f"ℹ️ 今天已对 UID: {uid} 打过招呼")
+                if classify_response("poke_popup", response.text) == "already":
+                    LOG.info(f"ℹ️ 今天已对 UID: {uid} 打过招呼")
                     success_count += 1
+                    self._mark_uid_done("poke", uid)
                     continue
 
-                content_match = re.search(r'<!\[CDATA\[(.*)\]\]>', response.text, re.DOTALL)
+                content_match = CDATA_CONTENT.search(response.text)
                 if not content_match:
                     raise ValueError("无法从响应中提取弹窗内容")
                 
-                soup = BeautifulSoup(content_match.group(1), 'html.parser')
-                form = soup.find('form', id=f'pokeform_{uid}')
-                if not form:
+                action_url_raw, formhash = HTML_EXTRACTOR.form_action_and_formhash(content_match.group(1), f'pokeform_{uid}')
+                if not action_url_raw or not formhash:
                     raise ValueError("未找到打招呼表单")
 
-                action_url_raw = form['action']
                 action_url = action_url_raw.replace('&', '&')
                 if not action_url.startswith('http'):
                     action_url = f"https://www.gamemale.com/{action_url.lstrip('/')}"
                 
-                formhash = form.find('input', {'name': 'formhash'})['value']
-                
                 payload = {
                     'formhash': formhash,
                     'handlekey': f'a_poke_{uid}',
@@ -647,33 +3385,28 @@ class GamemaleAutomation:
                     'Referer': f'https://www.gamemale.com/space-uid-{uid}.html'
                 })
                 
-                post_response = self._send_request('POST', action_url, data=payload, headers=final_headers)
+                post_response = self._send_request('POST', action_url, data=payload, headers=final_headers, rate_limit=False)
 
-                if '已发送' in post_response.text and '下次访问时会收到通知' in post_response.text:
-                    print(f"✅ 对 UID: {uid} 打招呼成功！")
+                if classify_response("poke", post_response.text) == "success":
+                    LOG.info(f"✅ 对 UID: {uid} 打招呼成功！")
                     success_count += 1
+                    self._mark_uid_done("poke", uid)
                 else:
-                    print(f"❌ 对 UID: {uid} 打招呼失败")
+                    LOG.info(f"❌ 对 UID: {uid} 打招呼失败")
             except Exception as e:
-                print(f"❌ 对 UID: {uid} 打招呼时发生异常: {e}")
-            finally:
-                time.sleep(random.uniform(1, 2))
+                LOG.info(f"❌ 对 UID: {uid} 打招呼时发生异常: {e}")
         
-        print(f"📊 打招呼完成: {success_count}/{len(user_ids)} 成功")
-        print("::endgroup::")
+        LOG.info(f"📊 打招呼完成: {success_count}/{len(user_ids)} 成功")
+        log_endgroup()
         return success_count > 0
 
     def _get_credits(self):
         """辅助函数：访问页面并解析返回所有积分。"""
         credit_page_url = 'https://www.gamemale.com/home.php?mod=spacecp&ac=credit&op=base'
         response = self._send_request('GET', credit_page_url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
         credits_data = {}
-        credit_list_items = soup.select('ul.creditl li')
-        for item in credit_list_items:
-            text = item.get_text(" ", strip=True)
-            match = re.match(r'(.+?):\s*([\d,]+\s*\S+)', text)
+        for text in HTML_EXTRACTOR.credit_items(response.text):
+            match = CREDIT_ITEM_PATTERN.match(text)
             if match:
                 name, value = match.groups()
                 credits_data[name.strip()] = value.strip()
@@ -681,18 +3414,18 @@ class GamemaleAutomation:
 
     def get_user_credits_and_exchange(self):
         """获取用户所有积分，并根据条件执行血液兑换旅程"""
-        print("::group::获取积分并检查兑换")
+        log_group("获取积分并检查兑换")
         exchange_status = None # None: 未执行, True: 成功, False: 失败
 
         try:
             # 1. 首次获取积分
             credits_data, credit_page_url = self._get_credits()
-            print("首次积分获取成功:", credits_data)
+            LOG.info("首次积分获取成功: %s", credits_data)
 
             # 2. 检查并执行兑换
             gamemale_config = self.config.get("gamemale", {})
             if not gamemale_config.get("auto_exchange_enabled", True):
-                print("ℹ️ 自动兑换功能已禁用，跳过。")
+                LOG.info("ℹ️ 自动兑换功能已禁用，跳过。")
                 return credits_data, None
 
             blood_value_str = credits_data.get("血液", "0 滴").split()[0]
@@ -701,10 +3434,10 @@ class GamemaleAutomation:
             if blood_value > 34:
                 password = gamemale_config.get("password")
                 if not password:
-                    print(f"ℹ️ 检测到血液 ({blood_value}) > 34，但未配置密码，无法执行兑换。")
+                    LOG.info(f"ℹ️ 检测到血液 ({blood_value}) > 34，但未配置密码，无法执行兑换。")
                     return credits_data, None
 
-                print(f"检测到血液 ({blood_value}) > 34，尝试兑换1旅程...")
+                LOG.info(f"检测到血液 ({blood_value}) > 34，尝试兑换1旅程...")
                 exchange_status = False # 默认为失败
                 
                 payload = {
@@ -721,68 +3454,103 @@ class GamemaleAutomation:
                 post_response = self._send_request('POST', exchange_url, data=payload, headers=headers)
                 
                 # 修正：使用正确的成功标识
-                if '积分操作成功' in post_response.text:
-                    print("✅ 血液兑换旅程成功！")
+                if classify_response("exchange", post_response.text) == "success":
+                    LOG.info("✅ 血液兑换旅程成功！")
                     exchange_status = True
                     # 刷新：兑换成功后，再次获取积分以更新数据
-                    print("🔄 兑换成功，正在刷新积分...")
+                    LOG.info("🔄 兑换成功，正在刷新积分...")
                     credits_data, _ = self._get_credits()
-                    print("刷新后积分:", credits_data)
+                    LOG.info("刷新后积分: %s", credits_data)
                 else:
-                    error_msg_match = re.search(r"errorhandle_credit\('([^']+)'", post_response.text)
+                    error_msg_match = CREDIT_ERROR_PATTERN.search(post_response.text)
                     if error_msg_match:
                         error_text = error_msg_match.group(1)
                     else:
                         error_text = post_response.text.strip()
-                    print(f"❌ 血液兑换失败: {error_text}")
+                    LOG.info(f"❌ 血液兑换失败: {error_text}")
 
             else:
-                print(f"血液 ({blood_value}) 不足34，不执行兑换。")
+                LOG.info(f"血液 ({blood_value}) 不足34，不执行兑换。")
 
         except Exception as e:
-            print(f"❌ 获取积分或执行兑换时出错: {e}")
+            LOG.info(f"❌ 获取积分或执行兑换时出错: {e}")
         finally:
-            print("::endgroup::")
+            log_endgroup()
             
         return credits_data, exchange_status
 
+    def _fetch_rule_log_table(self, url):
+        """
+        流式读取任务统计页，读到 table.dt 的 </table> 即停止，只把该表格交给解析器。
+        未找到表格（例如登录失效）时回退为完整请求，由 _send_request 处理重新登录。
+        """
+        table_end = {}
+
+        def table_complete(window, offset):
+            if "from" not in table_end:
+                match = RULE_LOG_TABLE_START.search(window)
+                if not match:
+                    return False
+                table_end["from"] = offset + match.end()
+            return "</table>" in window[max(0, table_end["from"] - offset):]
+
+        if self.config.get("performance", {}).get("stream_rule_log", True):
+            text = fetch_text_until(self.session, url, table_complete)
+        else:
+            text = self._send_request('GET', url).text
+        table_match = RULE_LOG_TABLE.search(text)
+        if not table_match:
+            table_match = RULE_LOG_TABLE.search(self._send_request('GET', url).text)
+        return table_match.group(0) if table_match else None
+
     def get_daily_task_summary(self):
-        """获取任务总次数统计"""
-        print("::group::获取任务总次数统计")
+        """
+        获取任务总次数统计。与本地快照对比，每行附上 changed 与 delta（今天增加的次数），
+        报告只列出有变化的行。
+        """
+        log_group("获取任务总次数统计")
         task_data = []
         
         try:
-            rewards_url = 'https://www.gamemale.com/home.php?mod=spacecp&ac=credit&op=log&suboperation=creditrulelog'
-            response = self._send_request('GET', rewards_url)
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            table = soup.find('table', class_='dt')
-            if not table:
-                print("未找到任务统计表格")
+            table_html = self._fetch_rule_log_table(RULE_LOG_URL)
+            rows = HTML_EXTRACTOR.table_rows(table_html, 'dt') if table_html else None
+            if rows is None:
+                LOG.info("未找到任务统计表格")
                 return task_data
 
-            print("任务总次数:")
-            for row in table.find_all('tr')[1:]:
-                columns = row.find_all('td')
+            for columns in rows[1:]:
                 if len(columns) >= 3: # 确保有足够列
-                    task_name = columns[0].get_text(strip=True)
-                    total_count = columns[1].get_text(strip=True)
-                    last_reward_time = columns[-1].get_text(strip=True) # 最后一列
                     task_data.append({
-                        "name": task_name,
-                        "count": total_count,
-                        "time": last_reward_time
+                        "name": columns[0],
+                        "count": columns[1],
+                        "time": columns[-1] # 最后一列
                     })
-                    print(f"  - {task_name}: {total_count} 次 (最后: {last_reward_time})")
+
+            snapshot = open_rule_log_snapshot(self.config)
+            if snapshot is None:
+                for task in task_data:
+                    task["changed"], task["delta"] = True, None
+            else:
+                if snapshot.baseline() is None:
+                    LOG.info("ℹ️ 首次记录任务统计快照，下次运行起只报告变化的行")
+                snapshot.diff(task_data)
+                snapshot.save(task_data)
+
+            changed = [task for task in task_data if task["changed"]]
+            LOG.info(f"任务总次数 ({len(changed)}/{len(task_data)} 项有变化):")
+            for task in changed:
+                delta_text = f" +{task['delta']}" if task["delta"] else ""
+                LOG.info(f"  - {task['name']}: {task['count']} 次{delta_text} (最后: {task['time']})")
                     
         except Exception as e:
-            print(f"获取任务总次数时出错: {e}")
+            LOG.info(f"获取任务总次数时出错: {e}")
         finally:
-            print("::endgroup::")
+            log_endgroup()
         
         return task_data
 
-    def generate_detailed_report(self, task_results, user_credits=None, task_summary_data=None):
+    def generate_detailed_report(self, task_results, user_credits=None, task_summary_data=None, task_timings=None,
+                                 request_summary=None):
         """生成详细的统计报告"""
         message = "🎉 Gamemale 每日任务完成统计\n\n"
         
@@ -806,37 +3574,219 @@ class GamemaleAutomation:
         message += "\n"
         
         if task_summary_data:
-            message += "📈 任务总次数统计:\n"
-            for task in task_summary_data:
-                message += f"  • {task['name']}: {task['count']} 次 (最后: {task['time']})\n"
+            changed = [task for task in task_summary_data if task.get("changed", True)]
+            message += "📈 任务总次数统计 (今日变化):\n"
+            for task in changed:
+                delta_text = f" (+{task['delta']})" if task.get("delta") else ""
+                message += f"  • {task['name']}: {task['count']} 次{delta_text} (最后: {task['time']})\n"
+            if len(changed) < len(task_summary_data):
+                message += f"  • 其余 {len(task_summary_data) - len(changed)} 项无变化\n"
+            message += "\n"
+
+        if task_timings:
+            message += "⏱️ 任务耗时:\n"
+            for task_name, (start, end) in task_timings.items():
+                start_text = time.strftime('%H:%M:%S', time.localtime(start))
+                end_text = time.strftime('%H:%M:%S', time.localtime(end))
+                message += f"  • {task_name}: {start_text} → {end_text} ({end - start:.1f}s)\n"
+            message += "\n"
+
+        if request_summary:
+            message += "🌐 请求统计 (p50/p95):\n"
+            for endpoint, stats in request_summary.items():
+                retries = f", 重试 {stats['retries']}" if stats['retries'] else ""
+                errors = f", 失败 {stats['errors']}" if stats['errors'] else ""
+                message += (f"  • {endpoint}: {stats['count']} 次, {stats['p50_ms']:.0f}/{stats['p95_ms']:.0f} ms, "
+                            f"{stats['bytes'] / 1024:.0f} KiB{retries}{errors}\n")
             message += "\n"
         
         return message
 
 
-# --- 多账号支持：从 GitHub Secrets 扫描 ACCOUNT_1 到 ACCOUNT_10 ---
+class AsyncGamemaleAutomation:
+    """
+    GamemaleAutomation 的 asyncio 版本：任务接口与同步版一一对应，可在同一事件循环中并发等待。
+    请求仍经由同步客户端的 _send_request / PoliteSession 发出（在线程池中执行），
+    因此重试语义、礼貌预算与同步版完全一致；同一个事件循环可以同时服务多个账号。
+    """
+
+    def __init__(self, config, executor=None, account_label=""):
+        self.client = GamemaleAutomation(config, account_label=account_label)
+        self._executor = executor
+
+    @property
+    def is_logged_in(self):
+        return self.client.is_logged_in
+
+    async def _call(self, func, *args, **kwargs):
+        """在线程池中执行阻塞调用，并携带当前上下文（输出缓冲等）"""
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, functools.partial(ctx.run, func, *args, **kwargs))
+
+    async def login(self):
+        return await self._call(self.client.login)
+
+    async def quick_daily_sign(self):
+        return await self._call(self.client.quick_daily_sign)
+
+    async def quick_daily_lottery(self):
+        return await self._call(self.client.quick_daily_lottery)
+
+    async def run_blog_interaction(self, target_interactions=10):
+        return await self._call(self.client.run_blog_interaction, target_interactions)
+
+    async def select_target_uids(self, processed_uids, limit=3):
+        return await self._call(self.client.select_target_uids, processed_uids, limit)
+
+    async def quick_visit_spaces(self, user_ids):
+        return await self._call(self.client.quick_visit_spaces, user_ids)
+
+    async def quick_poke_users(self, user_ids):
+        return await self._call(self.client.quick_poke_users, user_ids)
+
+    async def get_user_credits_and_exchange(self):
+        return await self._call(self.client.get_user_credits_and_exchange)
+
+    async def get_daily_task_summary(self):
+        return await self._call(self.client.get_daily_task_summary)
+
+    async def execute_all_tasks(self):
+        """异步版 execute_all_tasks：在事件循环中执行同一张任务依赖图"""
+        client = self.client
+        if not client._ready_for_tasks():
+            return None
+
+        log_group("开始执行任务 (异步模式)")
+        scheduler = TaskGraphScheduler(client.build_task_graph(), max_workers=client._task_workers())
+        await scheduler.run_async(self._call)
+        report_message = client._finish_task_graph(scheduler)
+        log_endgroup()
+        return report_message
+
+
+# --- 多账号支持：ACCOUNT_n 环境变量、GM_ACCOUNTS_JSON、账号文件与配置目录，并支持分片执行 ---
+
+_ACCOUNT_ENV_PATTERN = re.compile(r'^ACCOUNT_(\d+)$')
+
+
+def _parse_account_json(text, source):
+    """解析单个账号 JSON，无效时输出警告并返回 None"""
+    try:
+        account_data = json.loads(text)
+    except json.JSONDecodeError:
+        LOG.warning(f"{source} 的值不是有效的 JSON，已跳过。")
+        return None
+    if not isinstance(account_data, dict):
+        LOG.warning(f"{source} 不是 JSON 对象，已跳过。")
+        return None
+    return account_data
+
 
 def load_accounts_from_env():
     """
-    从环境变量中扫描 ACCOUNT_1 到 ACCOUNT_10，
-    每个变量的值应为一个合法的 JSON 配置对象（与 config.json 中 gamemale 字段格式相同）。
-    返回包含各账号配置的列表，每个元素为完整的 config dict。
+    按以下顺序收集账号，返回账号配置（dict）列表，每个元素与 config.json 中 gamemale 字段格式相同或为完整 config：
+      1. 环境变量 ACCOUNT_1、ACCOUNT_2 …（数量不限，按编号排序，未设置或为空的跳过）；
+      2. 环境变量 GM_ACCOUNTS_JSON：账号对象的 JSON 数组；
+      3. 环境变量 GM_ACCOUNTS_FILE：JSONL 文件，每行一个账号（空行与 # 开头的行忽略）；
+      4. 环境变量 GM_ACCOUNTS_DIR：目录中的每个 *.json 文件为一个账号，按文件名排序。
     """
     accounts = []
-    for i in range(1, 11):
-        env_key = f"ACCOUNT_{i}"
-        account_json_str = os.environ.get(env_key)
-        if not account_json_str:
-            continue  # 未设置则跳过
-        try:
-            account_data = json.loads(account_json_str)
-            print(f"::notice::检测到 {env_key}，已加载账号配置。")
+    numbered = sorted(
+        (int(match.group(1)), key) for key in os.environ
+        if (match := _ACCOUNT_ENV_PATTERN.match(key)) and os.environ[key].strip()
+    )
+    for _, env_key in numbered:
+        account_data = _parse_account_json(os.environ[env_key], env_key)
+        if account_data is not None:
+            log_notice(f"检测到 {env_key}，已加载账号配置。")
             accounts.append(account_data)
+
+    accounts_json = os.environ.get("GM_ACCOUNTS_JSON", "").strip()
+    if accounts_json:
+        try:
+            items = json.loads(accounts_json)
         except json.JSONDecodeError:
-            print(f"::warning::{env_key} 的值不是有效的 JSON，已跳过。")
+            items = None
+        if not isinstance(items, list):
+            LOG.warning("GM_ACCOUNTS_JSON 不是有效的 JSON 数组，已跳过。")
+        else:
+            loaded = [item for item in items if isinstance(item, dict)]
+            log_notice(f"从 GM_ACCOUNTS_JSON 加载了 {len(loaded)} 个账号。")
+            accounts.extend(loaded)
+
+    accounts_file = os.environ.get("GM_ACCOUNTS_FILE")
+    if accounts_file:
+        loaded = 0
+        with open(accounts_file, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                account_data = _parse_account_json(line, f"{accounts_file} 第 {line_no} 行")
+                if account_data is not None:
+                    accounts.append(account_data)
+                    loaded += 1
+        log_notice(f"从 {accounts_file} 加载了 {loaded} 个账号。")
+
+    accounts_dir = os.environ.get("GM_ACCOUNTS_DIR")
+    if accounts_dir:
+        loaded = 0
+        for name in sorted(os.listdir(accounts_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(accounts_dir, name), encoding="utf-8") as f:
+                    account_data = _parse_account_json(f.read(), name)
+                if account_data is not None:
+                    accounts.append(account_data)
+                    loaded += 1
+        log_notice(f"从目录 {accounts_dir} 加载了 {loaded} 个账号。")
     return accounts
 
 
+def parse_shard(value):
+    """解析 "i/N" 形式的分片参数，返回 (i, N)；i 从 1 开始"""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(\d+)\s*', value or "")
+    if not match or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise ValueError(f"分片参数应为 i/N 且 1 <= i <= N，收到: {value}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def select_shard(accounts, shard_index, shard_count):
+    """按账号序号轮流分配到各分片（第 k 个账号属于第 (k-1) % N + 1 片），返回 [(全局序号, 账号配置)]"""
+    return [(idx, account) for idx, account in enumerate(accounts, start=1)
+            if (idx - 1) % shard_count == shard_index - 1]
+
+
+def write_shard_report(report_dir, shard, labeled_reports):
+    """把本分片各账号的报告写入 report_dir，供 --merge 汇总"""
+    os.makedirs(report_dir, exist_ok=True)
+    shard_index, shard_count = shard
+    path = os.path.join(report_dir, f"report_shard_{shard_index}_of_{shard_count}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"shard": shard_index, "shard_count": shard_count,
+                   "reports": [{"index": idx, "report": report} for idx, report in labeled_reports]},
+                  f, ensure_ascii=False, indent=2)
+    LOG.info(f"ℹ️ 分片报告已写入 {path}")
+
+
+def merge_shard_reports(report_dir):
+    """读取 report_dir 中所有分片报告，按账号全局序号合并为一份报告；缺失的分片会在报告中注明"""
+    entries, shards_found, shard_count = [], set(), None
+    for name in sorted(os.listdir(report_dir)):
+        if name.startswith("report_shard_") and name.endswith(".json"):
+            with open(os.path.join(report_dir, name), encoding="utf-8") as f:
+                data = json.load(f)
+            shards_found.add(data["shard"])
+            shard_count = data["shard_count"]
+            entries.extend((item["index"], item["report"]) for item in data["reports"])
+    combined = "\n\n".join(report for _, report in sorted(entries)) or "⚠️ 未找到任何账号报告"
+    if shard_count:
+        missing = sorted(set(range(1, shard_count + 1)) - shards_found)
+        if missing:
+            combined += f"\n\n⚠️ 缺少分片 {missing} 的报告（对应任务可能执行失败）"
+    return combined
+
+
 def build_config_for_account(base_config, account_data):
     """
     将单个账号数据合并进基础配置，生成该账号专用的完整 config。
@@ -860,114 +3810,351 @@ def build_config_for_account(base_config, account_data):
     return config
 
 
-def run_single_account(config, account_label=""):
-    """对单个账号执行全部任务，返回报告字符串。"""
-    prefix = f"[{account_label}] " if account_label else ""
+def _account_prefix(account_label):
+    return f"[{account_label}] " if account_label else ""
 
+
+def _account_config_error(config, account_label=""):
+    """账号缺少登录凭据时输出并返回跳过提示，否则返回 None"""
     gamemale_config = config.get("gamemale", {})
-    if not gamemale_config.get("cookie") and not (
-        gamemale_config.get("username") and gamemale_config.get("password")
-    ):
-        msg = f"{prefix}❌ 账号配置不完整（缺少 cookie 或 username/password），已跳过。"
-        print(msg)
-        return msg
+    if gamemale_config.get("cookie") or (gamemale_config.get("username") and gamemale_config.get("password")):
+        return None
+    msg = f"{_account_prefix(account_label)}❌ 账号配置不完整（缺少 cookie 或 username/password），已跳过。"
+    LOG.info(msg)
+    return msg
 
-    client = GamemaleAutomation(config)
 
-    if not client.login():
-        msg = f"{prefix}❌ 登录失败，跳过该账号的任务。"
-        print(msg)
-        return msg
+def _login_failed_report(account_label=""):
+    msg = f"{_account_prefix(account_label)}❌ 登录失败，跳过该账号的任务。"
+    LOG.info(msg)
+    return msg
 
-    report = client.execute_all_tasks()
 
+def _finish_account_report(config, report, account_label=""):
+    """在报告头部注明账号标识、输出完成提示并发送该账号的通知（同步与异步执行共用）"""
+    prefix = _account_prefix(account_label)
     if report:
-        # 在报告头部注明账号标识
         report = f"{prefix}任务报告\n{'='*40}\n{report}"
-        print(f"{prefix}🎉 所有任务执行完成！")
+        LOG.info(f"{prefix}🎉 所有任务执行完成！")
     else:
         report = f"{prefix}⚠ 任务执行失败或未生成报告。"
-        print(report)
+        LOG.info(report)
+
+    notify_account_report(config, report, account_label)
+    return report
+
+
+def run_single_account(config, account_label=""):
+    """对单个账号执行全部任务，返回报告字符串。"""
+    error = _account_config_error(config, account_label)
+    if error:
+        return error
+
+    client = GamemaleAutomation(config, account_label=account_label)
+    if not client.login():
+        return _login_failed_report(account_label)
+    return _finish_account_report(config, client.execute_all_tasks(), account_label)
+
+
+def get_max_workers(base_config):
+    """读取多账号并发数：环境变量 GM_MAX_WORKERS > performance.max_workers > 1（串行）"""
+    value = os.environ.get("GM_MAX_WORKERS") or base_config.get("performance", {}).get("max_workers", 1)
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        LOG.warning(f"并发数配置无效 ({value})，回退为串行执行。")
+        return 1
+
+
+def configure_global_politeness(base_config):
+    """按 performance 配置调整进程级主机礼貌预算（需在发出任何请求前调用）"""
+    performance_config = base_config.get("performance", {})
+    GLOBAL_POLITENESS.max_inflight = max(1, int(performance_config.get("host_max_inflight", 4)))
+    GLOBAL_POLITENESS.min_interval = max(0.0, float(performance_config.get("host_min_interval", 0.0)))
+
+
+def _account_labels(accounts, labels=None):
+    """账号标识：默认按顺序编号为 账号1、账号2 …；分片执行时由调用方传入全局编号"""
+    return labels or [f"账号{idx}" for idx in range(1, len(accounts) + 1)]
+
+
+def _log_account_start(label):
+    LOG.info(f"\n{'='*50}")
+    LOG.info(f"🚀 开始处理 {label}")
+    LOG.info(f"{'='*50}")
+
+
+def run_accounts_serially(base_config, accounts, labels=None):
+    """逐个执行账号任务（原有行为），相邻账号的开始间隔由 rate_limits.account 控制。"""
+    all_reports = []
+    for label, account_data in zip(_account_labels(accounts, labels), accounts):
+        _CURRENT_ACCOUNT.set(label)
+        # 账号间限速，避免频繁请求；上一个账号耗时已足够长时不再等待
+        wait_seconds = ACCOUNT_START_BUCKET.reserve()
+        if wait_seconds > 0:
+            LOG.info(f"⏳ 等待 {wait_seconds:.1f} 秒后处理下一个账号...")
+            traced_sleep(wait_seconds, "account_start")
+
+        _log_account_start(label)
+        account_config = build_config_for_account(base_config, account_data)
+        with TRACER.span(label, "account"):
+            report = run_single_account(account_config, account_label=label)
+        all_reports.append(report)
+    return all_reports
 
+
+def _begin_buffered_account(label):
+    """在当前上下文（工作线程或 asyncio 任务）中为账号建立独立的输出缓冲区，返回该缓冲区"""
+    buffer = []
+    _OUTPUT_BUFFER.set(buffer)
+    _CURRENT_ACCOUNT.set(label)
+    _log_account_start(label)
+    return buffer
+
+
+def _account_error_report(label, error):
+    report = f"[{label}] ❌ 执行账号任务时出错: {error}"
+    LOG.info(report)
     return report
 
 
-def main():
+@contextlib.contextmanager
+def _ordered_account_output():
+    """
+    账号并发执行期间把 print 输出路由到各账号的缓冲区；产出的 emit(buffer) 由调用方按账号顺序调用，
+    整体输出一个账号的日志，保证输出与报告顺序确定。
+    """
+    original_stdout = sys.stdout
+    sys.stdout = _OutputRouter(original_stdout)
+
+    def emit(buffer):
+        original_stdout.write("".join(buffer))
+        original_stdout.flush()
+
+    try:
+        yield emit
+    finally:
+        sys.stdout = original_stdout
+
+
+def _run_account_buffered(base_config, account_data, label):
+    """在工作线程中执行单个账号，输出写入该账号独立的缓冲区。"""
+    buffer = _begin_buffered_account(label)
+    try:
+        account_config = build_config_for_account(base_config, account_data)
+        with TRACER.span(label, "account"):
+            report = run_single_account(account_config, account_label=label)
+    except Exception as e:
+        report = _account_error_report(label, e)
+    return report, buffer
+
+
+def run_accounts_concurrently(base_config, accounts, max_workers, labels=None):
+    """
+    使用有界线程池并发执行多个账号，每个账号拥有独立的会话与礼貌预算。
+    各账号的日志按账号顺序整体输出，报告顺序与账号顺序一致。
+    """
+    log_notice(f"并发模式：{len(accounts)} 个账号，{max_workers} 个工作线程。")
+
+    all_reports = []
+    with _ordered_account_output() as emit, \
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="account") as executor:
+        futures = [
+            submit_in_context(executor, _run_account_buffered, base_config, account_data, label)
+            for label, account_data in zip(_account_labels(accounts, labels), accounts)
+        ]
+        # 按提交顺序等待，前序账号完成即可输出其日志
+        for future in futures:
+            report, buffer = future.result()
+            emit(buffer)
+            all_reports.append(report)
+    return all_reports
+
+
+async def run_single_account_async(config, account_label="", executor=None):
+    """run_single_account 的异步版本，返回报告字符串。"""
+    error = _account_config_error(config, account_label)
+    if error:
+        return error
+
+    client = AsyncGamemaleAutomation(config, executor=executor, account_label=account_label)
+    if not await client.login():
+        return _login_failed_report(account_label)
+    return _finish_account_report(config, await client.execute_all_tasks(), account_label)
+
+
+async def run_accounts_async(base_config, accounts, max_workers, labels=None):
+    """
+    在单个事件循环中同时处理多个账号（最多 max_workers 个账号同时进行）。
+    各账号日志按账号顺序整体输出，报告顺序与账号顺序一致。
+    """
+    io_threads = max(1, int(base_config.get("performance", {}).get("async_io_threads", 16)))
+    log_notice(f"异步模式：{len(accounts)} 个账号，最多 {max_workers} 个账号同时进行，{io_threads} 个 I/O 线程。")
+    account_slots = asyncio.Semaphore(max_workers)
+
+    async def run_one(label, account_data):
+        async with account_slots:
+            buffer = _begin_buffered_account(label)  # asyncio 任务拥有独立的上下文副本
+            try:
+                account_config = build_config_for_account(base_config, account_data)
+                with TRACER.span(label, "account"):
+                    report = await run_single_account_async(account_config, label, executor)
+            except Exception as e:
+                report = _account_error_report(label, e)
+        return report, buffer
+
+    all_reports = []
+    with _ordered_account_output() as emit, \
+            ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="async-io") as executor:
+        tasks = [asyncio.create_task(run_one(label, account_data))
+                 for label, account_data in zip(_account_labels(accounts, labels), accounts)]
+        for task in tasks:
+            report, buffer = await task
+            emit(buffer)
+            all_reports.append(report)
+    return all_reports
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Gamemale 每日任务自动化")
+    parser.add_argument("--shard", default=os.environ.get("GM_SHARD"),
+                        help="只处理第 i 份账号，格式 i/N（例如 2/4），也可用环境变量 GM_SHARD 设置")
+    parser.add_argument("--report-dir", default=os.environ.get("GM_REPORT_DIR"),
+                        help="把本次的账号报告写入该目录并跳过汇总通知，由 --merge 统一汇总")
+    parser.add_argument("--merge", metavar="REPORT_DIR",
+                        help="只汇总 REPORT_DIR 中各分片的报告并发送通知，不执行任务")
+    return parser.parse_args(argv)
+
+
+def merge_and_notify(report_dir):
+    """汇总各分片报告并发送一条通知"""
+    base_config = load_config(required=False)
+    configure_logging(base_config)
+    combined_report = merge_shard_reports(report_dir)
+    LOG.info("\n" + "="*50)
+    LOG.info("📋 所有账号任务汇总报告:")
+    LOG.info(combined_report)
+    LOG.info("="*50)
+    send_notification(base_config, combined_report, title="汇总")
+    flush_notifications()
+
+
+def main(argv=None):
     """主程序"""
+    args = parse_args(argv)
+    if args.merge:
+        merge_and_notify(args.merge)
+        return
     try:
-        # 1. 扫描 ACCOUNT_1 ~ ACCOUNT_10 环境变量（优先判断，决定加载模式）
+        shard = parse_shard(args.shard) if args.shard else None
+
+        # 1. 收集多账号配置（优先判断，决定加载模式）
         accounts_from_env = load_accounts_from_env()
 
         # 2. 加载基础配置：多账号模式下非必须，单账号模式下必须
-        base_config = load_config(required=len(accounts_from_env) == 0)
+        base_config = load_config(required=len(accounts_from_env) == 0 and (shard is None or shard[0] == 1))
+        configure_logging(base_config)
+        configure_tracing(base_config)
+        configure_global_politeness(base_config)
+        configure_shared_transport(base_config)
+        configure_rate_limits(base_config)
+        configure_html_extractor(base_config)
 
         # 3. 决定运行模式
         if accounts_from_env:
             # --- 多账号模式 ---
-            print(f"::notice::检测到 {len(accounts_from_env)} 个账号，进入多账号模式。")
-            all_reports = []
-
-            for idx, account_data in enumerate(accounts_from_env, start=1):
-                label = f"账号{idx}"
-                print(f"\n{'='*50}")
-                print(f"🚀 开始处理 {label}")
-                print(f"{'='*50}")
-
-                account_config = build_config_for_account(base_config, account_data)
-                report = run_single_account(account_config, account_label=label)
-                all_reports.append(report)
-
-                # 账号间随机等待，避免频繁请求
-                if idx < len(accounts_from_env):
-                    wait_seconds = random.uniform(5, 15)
-                    print(f"⏳ 等待 {wait_seconds:.1f} 秒后处理下一个账号...")
-                    time.sleep(wait_seconds)
+            log_notice(f"检测到 {len(accounts_from_env)} 个账号，进入多账号模式。")
+            selected = list(enumerate(accounts_from_env, start=1))
+            if shard:
+                selected = select_shard(accounts_from_env, *shard)
+                log_notice(f"分片 {shard[0]}/{shard[1]}：处理其中 {len(selected)} 个账号。")
+            indexes = [idx for idx, _ in selected]
+            accounts = [account for _, account in selected]
+            labels = [f"账号{idx}" for idx in indexes]
+            max_workers = get_max_workers(base_config)
+            if not accounts:
+                all_reports = []
+            elif base_config.get("performance", {}).get("async_mode"):
+                all_reports = asyncio.run(run_accounts_async(base_config, accounts, max_workers, labels))
+            elif max_workers > 1:
+                all_reports = run_accounts_concurrently(base_config, accounts, max_workers, labels)
+            else:
+                all_reports = run_accounts_serially(base_config, accounts, labels)
 
-            # 汇总所有账号报告
-            combined_report = "\n\n".join(all_reports)
-            print("\n" + "="*50)
-            print("📋 所有账号任务汇总报告:")
-            print(combined_report)
-            print("="*50)
+            if args.report_dir:
+                # 分片模式：报告交给汇总步骤统一通知
+                write_shard_report(args.report_dir, shard or (1, 1), list(zip(indexes, all_reports)))
+            else:
+                # 汇总所有账号报告
+                combined_report = "\n\n".join(all_reports)
+                LOG.info("\n" + "="*50)
+                LOG.info("📋 所有账号任务汇总报告:")
+                LOG.info(combined_report)
+                LOG.info("="*50)
 
-            # 发送汇总通知（使用基础配置中的通知设置）
-            send_notification(base_config, combined_report)
+                # 发送汇总通知（使用基础配置中的通知设置）
+                send_notification(base_config, combined_report, title="汇总")
 
+        elif shard and shard[0] != 1:
+            # 单账号模式只由第 1 个分片执行；写入空报告，汇总时不把本分片当作缺失
+            log_notice(f"单账号模式，分片 {shard[0]}/{shard[1]} 无需执行。")
+            if args.report_dir:
+                write_shard_report(args.report_dir, shard, [])
         else:
             # --- 单账号模式（原有逻辑）---
-            print("::notice::未检测到 ACCOUNT_x 环境变量，使用基础配置的单账号模式。")
+            log_notice("未检测到 ACCOUNT_x 环境变量，使用基础配置的单账号模式。")
 
             gamemale_config = base_config.get("gamemale", {})
             if not gamemale_config.get("cookie") and not (
                 gamemale_config.get("username") and gamemale_config.get("password")
             ):
-                print("::error::错误：必须配置 gamemale.cookie 或 (gamemale.username 和 gamemale.password)。")
+                LOG.error("错误：必须配置 gamemale.cookie 或 (gamemale.username 和 gamemale.password)。")
                 exit(1)
 
-            client = GamemaleAutomation(base_config)
+            if base_config.get("performance", {}).get("async_mode"):
+                async def login_and_execute():
+                    client = AsyncGamemaleAutomation(base_config)
+                    if not await client.login():
+                        raise Exception("登录失败")
+                    return await client.execute_all_tasks()
 
-            if not client.login():
-                raise Exception("登录失败")
+                detailed_report = asyncio.run(login_and_execute())
+            else:
+                client = GamemaleAutomation(base_config)
+
+                if not client.login():
+                    raise Exception("登录失败")
 
-            detailed_report = client.execute_all_tasks()
+                detailed_report = client.execute_all_tasks()
 
             if detailed_report:
-                print("🎉 所有任务执行完成！")
-                print("\n" + "="*50)
-                print("详细报告:")
-                print(detailed_report)
-                print("="*50)
+                LOG.info("🎉 所有任务执行完成！")
+                LOG.info("\n" + "="*50)
+                LOG.info("详细报告:")
+                LOG.info(detailed_report)
+                LOG.info("="*50)
 
-                send_notification(base_config, detailed_report)
+                if args.report_dir:
+                    write_shard_report(args.report_dir, shard or (1, 1), [(1, detailed_report)])
+                else:
+                    send_notification(base_config, detailed_report)
             else:
-                print("⚠ 任务执行失败或未生成报告。")
+                LOG.info("⚠ 任务执行失败或未生成报告。")
+
+        flush_notifications()
+        print_login_metrics()
+        print_transport_report()
+        print_startup_report()
+        export_trace()
 
     except Exception as e:
         error_message = f"❌ 脚本执行失败: {e}"
-        print(error_message)
+        LOG.info(error_message)
+        export_trace()
         # base_config 可能未成功加载，需保护
         try:
             send_notification(base_config, error_message)
+            flush_notifications()
         except Exception:
             pass
         exit(1)
@@ -0,0 +1,104 @@
+import os
+import sys
+import threading
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import gamemale_daily as gm  # noqa: E402
+
+EXPIRED_PAGE = "<div>您需要先登录才能继续本操作</div>"
+HOME_PAGE = '<input type="hidden" name="formhash" value="abcdef12" />'
+
+
+def _response(url, text):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.headers["Content-Type"] = "text/html; charset=utf-8"
+    response._content = text.encode("utf-8")
+    response.encoding = "utf-8"
+    return response
+
+
+def _client(pages):
+    """pages 依次作为每次请求的响应正文；登录只走 Cookie 校验这一步"""
+    config = {
+        "gamemale": {"cookie": "auth=1"},
+        "performance": {
+            "session_cache": {"enabled": False},
+            "daily_ledger": {"enabled": False},
+            "candidate_pool": {"enabled": False},
+        },
+    }
+    client = gm.GamemaleAutomation(config)
+    pages = iter(pages)
+    client.session.request = lambda method, url, **kwargs: _response(url, next(pages))
+    client._login_with_cookie = lambda: True
+    return client
+
+
+def _run_with_timeout(func, timeout=5):
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(value=func()), daemon=True)
+    worker.start()
+    worker.join(timeout)
+    assert not worker.is_alive(), "会话刷新未在超时内结束（疑似死锁）"
+    return result["value"]
+
+
+def test_refresh_does_not_reenter_when_login_sees_expired_page():
+    # 任务请求失效 -> 刷新并重新登录 -> 登录获取 formhash 时再次看到失效页，不应递归刷新或死锁
+    client = _client([EXPIRED_PAGE, EXPIRED_PAGE, EXPIRED_PAGE])
+    client.is_logged_in = True
+    client.formhash = "old"
+
+    response = _run_with_timeout(lambda: client._send_request("GET", "https://www.gamemale.com/task"))
+
+    assert EXPIRED_PAGE in response.text
+    assert client.formhash is None
+    # FormHash 获取失败时登录仍视为成功（与未刷新时一致），但刷新只发生一次
+    assert client.is_logged_in
+    assert client._session_refreshed
+
+
+def test_refresh_resends_request_after_relogin():
+    client = _client([EXPIRED_PAGE, HOME_PAGE, "ok"])
+    client.is_logged_in = True
+
+    response = _run_with_timeout(lambda: client._send_request("GET", "https://www.gamemale.com/task"))
+
+    assert response.text == "ok"
+    assert client.formhash == "abcdef12"
+    assert client.is_logged_in
+
+
+def test_concurrent_expired_responses_wait_for_single_refresh():
+    client = _client([])
+    client.is_logged_in = True
+    release_login = threading.Event()
+    logins = []
+
+    def slow_login():
+        logins.append(threading.get_ident())
+        release_login.wait(5)
+        client.is_logged_in = True
+        return True
+
+    client.login = slow_login
+    first = threading.Thread(target=client._refresh_session, daemon=True)
+    first.start()
+    while not logins:
+        pass
+    waiter_result = {}
+    waiter = threading.Thread(target=lambda: waiter_result.update(value=client._refresh_session()), daemon=True)
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive(), "其它线程应等待正在进行的刷新"
+
+    release_login.set()
+    first.join(5)
+    waiter.join(5)
+    assert waiter_result["value"] is True
+    assert len(logins) == 1